@@ -0,0 +1,189 @@
+import logging
+import threading
+import time
+import pandas as pd
+from metrics import Metrics
+from streams import StreamWorker
+from tradingAPI import TERMINAL_STATUSES
+
+ORDER_FIELDS = {
+    "s": "symbol",
+    "c": "clientOrderId",
+    "S": "side",
+    "o": "type",
+    "f": "timeInForce",
+    "q": "origQty",
+    "p": "price",
+    "ap": "avgPrice",
+    "sp": "stopPrice",
+    "X": "status",
+    "i": "orderId",
+    "z": "executedQty",
+    "T": "updateTime",
+    "R": "reduceOnly",
+    "wt": "workingType",
+    "ot": "origType",
+    "ps": "positionSide",
+    "cp": "closePosition",
+    "pP": "priceProtect"
+}
+
+POSITION_FIELDS = {
+    "s": "symbol",
+    "pa": "positionAmt",
+    "ep": "entryPrice",
+    "bep": "breakEvenPrice",
+    "up": "unRealizedProfit",
+    "mt": "marginType",
+    "iw": "isolatedWallet",
+    "ps": "positionSide"
+}
+
+BALANCE_FIELDS = {
+    "a": "asset",
+    "wb": "balance",
+    "cw": "crossWalletBalance",
+    "bc": "balanceChange"
+}
+
+class AccountState(StreamWorker):
+    path = "/ws"
+
+    def __init__(
+            self,
+            api,
+            base_url: str = "wss://fstream.binance.com",
+            keepalive: float = 1800.0,
+            reconnect_delay: float = 1.0,
+            timeout: float = 30.0,
+            metrics: Metrics = None
+        ) -> None:
+        super().__init__(reconnect_delay= reconnect_delay, timeout= timeout, metrics= metrics)
+        self.api = api
+        self.base_url = base_url
+        self.keepalive = keepalive
+        self.listen_key = None
+        self.orders = {}
+        self.client_orders = {}
+        self.positions = {}
+        self.balances = {}
+        self._keepalive_time = 0.0
+        self._lock = threading.RLock()
+
+    def url(self) -> str:
+        if self.listen_key is None:
+            self.listen_key = self.api.um_listen_key()
+            self._keepalive_time = time.monotonic()
+        return "{}/ws/{}".format(self.base_url, self.listen_key)
+
+    def stop(self) -> None:
+        super().stop()
+        if self.listen_key is not None:
+            try:
+                self.api.um_close_listen_key()
+            except Exception as error:
+                logging.debug("AccountState: closing listenKey failed: {}".format(error))
+            self.listen_key = None
+
+    def heartbeat(self) -> None:
+        if time.monotonic() - self._keepalive_time > self.keepalive:
+            try:
+                self.api.um_keepalive_listen_key()
+            except Exception:
+                # the key may be gone; reconnect on a fresh one and resync
+                self.listen_key = None
+                raise
+            self._keepalive_time = time.monotonic()
+
+    def on_open(self) -> None:
+        self.resync()
+
+    def resync(self) -> None:
+        open_orders = self.api.um_open_orders().to_dict("records")
+        positions = self.api.um_position_risk()
+        balances = self.api.um_balance()
+        with self._lock:
+            self.orders = {int(order["orderId"]): order for order in open_orders}
+            self.client_orders = {order["clientOrderId"]: int(order["orderId"]) for order in open_orders}
+            self.positions = {(position["symbol"], position["positionSide"]): position for position in positions}
+            self.balances = {balance["asset"]: balance for balance in balances}
+
+    def on_message(self, message: dict) -> None:
+        event = message.get("e")
+        if event == "ORDER_TRADE_UPDATE":
+            self._apply_order(message["o"])
+        elif event == "ACCOUNT_UPDATE":
+            self._apply_account(message["a"], message["T"])
+        elif event == "listenKeyExpired":
+            logging.debug("AccountState: listenKey expired, reconnecting")
+            self.listen_key = None
+            self._ws.close()
+
+    def _apply_order(self, update: dict) -> None:
+        order = {name: update[key] for key, name in ORDER_FIELDS.items() if key in update}
+        order_id = int(order["orderId"])
+        if getattr(self.api, "orders", None) is not None:
+            self.api.orders.update(order, create= False)
+        with self._lock:
+            known = self.orders.get(order_id)
+            if known is not None and int(known.get("updateTime", 0)) > int(order["updateTime"]):
+                return
+            if order["status"] in TERMINAL_STATUSES:
+                self.orders.pop(order_id, None)
+                self.client_orders.pop(order["clientOrderId"], None)
+            else:
+                self.orders[order_id] = dict(known or {}, **order)
+                self.client_orders[order["clientOrderId"]] = order_id
+
+    def _apply_account(self, update: dict, update_time: int) -> None:
+        with self._lock:
+            for balance in update.get("B", []):
+                balance = {name: balance[key] for key, name in BALANCE_FIELDS.items() if key in balance}
+                self.balances[balance["asset"]] = dict(self.balances.get(balance["asset"], {}), **balance)
+            for position in update.get("P", []):
+                position = {name: position[key] for key, name in POSITION_FIELDS.items() if key in position}
+                key = (position["symbol"], position["positionSide"])
+                known = self.positions.get(key, {})
+                if int(known.get("updateTime", 0)) > update_time:
+                    continue
+                self.positions[key] = dict(known, updateTime= update_time, **position)
+
+    def order(
+            self,
+            client_order_id: str = None,
+            order_id: int = None
+        ) -> dict:
+        with self._lock:
+            if order_id is None:
+                order_id = self.client_orders.get(client_order_id)
+            return self.orders.get(order_id)
+
+    def open_orders(self, symbol: str = None) -> pd.DataFrame:
+        with self._lock:
+            orders = list(self.orders.values())
+        if symbol is not None:
+            orders = [order for order in orders if order["symbol"] == symbol]
+        return pd.DataFrame(orders)
+
+    def search_order(
+            self,
+            symbol: str,
+            client_order_id: str
+        ) -> pd.DataFrame:
+        order = self.order(client_order_id= client_order_id)
+        return pd.DataFrame([order] if order is not None and order["symbol"] == symbol else [])
+
+    def position(
+            self,
+            symbol: str,
+            position_side: str
+        ) -> dict:
+        with self._lock:
+            return self.positions.get((symbol, position_side))
+
+    def positions_frame(self, symbol: str = None) -> pd.DataFrame:
+        with self._lock:
+            positions = list(self.positions.values())
+        if symbol is not None:
+            positions = [position for position in positions if position["symbol"] == symbol]
+        return pd.DataFrame(positions)
@@ -0,0 +1,709 @@
+import asyncio
+import json
+import logging
+import time
+import urllib.parse
+import aiohttp
+import numpy as np
+import pandas as pd
+from yarl import URL
+from klineStore import KlineStore
+from metrics import Metrics
+from tradingAPI import bucket_start, kline_pages, merge_pages, decode_klines, klines_frame, funding_frame, funding_table, position_frame, portfolio_frame, symbol_filters, request_weight, load_payload
+from tradingAPI import order_payloads, batch_error_rows, RateLimiter, RetryPolicy, Signer, RequestCache, OrderIndex, EndpointRouter, host_failure, order_ack, ClientError, TradingAPIError, NetworkError
+
+class ASYNC_TRADING_API:
+    def __init__(
+            self,
+            key,
+            secret,
+            log_path,
+            pool_size: int = 100,
+            timeout: tuple = (3.05, 10),
+            headers: dict = None,
+            info_ttl: float = 3600,
+            store = None,
+            limiter: RateLimiter = None,
+            retry: RetryPolicy = None,
+            metrics: Metrics = None,
+            base_url: str = "https://fapi.binance.com",
+            signer: Signer = None,
+            cache: RequestCache = None,
+            orders: OrderIndex = None,
+            router: EndpointRouter = None
+        ) -> None:
+        self.key = key
+        self.router = None if router is None else router.attach()
+        self.base_url = base_url if router is None else router.urls[0]
+        self.secret = secret
+        self.signer = Signer(secret) if signer is None else signer
+        self.cache = RequestCache(max_entries= 0) if cache is None else cache
+        self.orders = OrderIndex() if orders is None else orders
+        self._sync_task = None
+        self.pool_size = pool_size
+        self.timeout = aiohttp.ClientTimeout(sock_connect= timeout[0], sock_read= timeout[1])
+        self.headers = {"X-MBX-APIKEY": key}
+        if headers is not None:
+            self.headers.update(headers)
+        self.session = None
+        self.limiter = RateLimiter() if limiter is None else limiter
+        self.retry = RetryPolicy() if retry is None else retry
+        self.metrics = metrics
+        self.info_ttl = info_ttl
+        self._symbols = {}
+        self._filters = {}
+        self._info_time = None
+        self._info_lock = None
+        self.store = KlineStore(store) if isinstance(store, str) else store
+        logging.basicConfig(filename= log_path, level= logging.DEBUG)
+
+    def _session(self) -> aiohttp.ClientSession:
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit= self.pool_size)
+            self.session = aiohttp.ClientSession(connector= connector, headers= self.headers, timeout= self.timeout)
+        return self.session
+
+    async def close(self) -> None:
+        if self.session is not None:
+            await self.session.close()
+        if self.router is not None:
+            self.router.detach()
+            self.router = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.close()
+
+    async def _send(
+            self,
+            method: str,
+            url
+        ) -> tuple:
+        try:
+            async with self._session().request(method, url) as response:
+                self.limiter.update(response.headers, response.status)
+                body = await response.read()
+                status = response.status
+        except aiohttp.ClientConnectorError as error:
+            raise NetworkError(str(error), sent= False) from error
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise NetworkError(str(error), sent= True) from error
+        return status, body
+
+    async def _request(
+            self,
+            method: str,
+            endpoint: str,
+            params: dict = None,
+            signed: bool = False,
+            retry: RetryPolicy = None,
+            decode = None
+        ):
+        started = time.monotonic()
+        path = URL(endpoint).path
+        query = None if params is None else urllib.parse.urlencode(params)
+        call = lambda: self._call(method, endpoint, path, params, query, signed, retry)
+        if method == "GET" and not signed:
+            data = await self._fetch((path, query), call, self.cache.expiry(path, params))
+        else:
+            data = await call()
+        decoded = time.perf_counter()
+        if decode is not None:
+            data = decode(data)
+        if self.metrics is not None:
+            self.metrics.observe(path, "decode", time.perf_counter() - decoded)
+            self.metrics.observe(path, "total", time.monotonic() - started)
+        return data
+
+    async def _fetch(
+            self,
+            key: tuple,
+            call,
+            expires: float
+        ):
+        hit, value = self.cache.get(key)
+        if hit:
+            return value
+        # the fetch runs as its own task so cancelling any caller, the first one included, leaves it running for the rest
+        task, leader = self.cache.join(key, lambda: asyncio.ensure_future(self._lead(key, call, expires)))
+        if leader:
+            task.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return await asyncio.shield(task)
+
+    async def _lead(
+            self,
+            key: tuple,
+            call,
+            expires: float
+        ):
+        try:
+            value = await call()
+            self.cache.put(key, value, expires)
+            return value
+        finally:
+            self.cache.leave(key)
+
+    async def _call(
+            self,
+            method: str,
+            endpoint: str,
+            path: str,
+            params: dict,
+            query: str,
+            signed: bool,
+            retry: RetryPolicy
+        ):
+        retry = self.retry if retry is None else retry
+        weight, orders = request_weight(method, path, params)
+        if signed and self.signer.needs_sync():
+            await self.um_sync_time()
+        metrics = self.metrics
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            delay = self.limiter.reserve(weight, orders)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            host = None if self.router is None else self.router.select()
+            try:
+                clock = time.perf_counter()
+                url = endpoint if host is None else host + path
+                if query is not None:
+                    url = URL(url + "?" + (self.signer.sign(query) if signed else query), encoded= True)
+                sent = time.perf_counter()
+                if metrics is not None:
+                    metrics.request(path, method, weight)
+                status, body = await self._send(method, url)
+                received = time.perf_counter()
+                if metrics is not None:
+                    if signed:
+                        metrics.observe(path, "sign", sent - clock)
+                    metrics.observe(path, "network", received - sent)
+                data = load_payload(status, body)
+                if host is not None:
+                    self.router.success(host, received - sent)
+                if metrics is not None:
+                    metrics.observe(path, "parse", time.perf_counter() - received)
+                return data
+            except TradingAPIError as error:
+                if host is not None:
+                    if host_failure(error):
+                        self.router.failure(host, error)
+                    else:
+                        self.router.success(host, time.perf_counter() - sent)
+                elapsed = time.monotonic() - started
+                delay = retry.delay(error, attempt, method, elapsed)
+                if delay is not None:
+                    delay = max(delay, self.limiter.blocked_until - time.time())
+                if metrics is not None:
+                    metrics.error(path, error)
+                if delay is None or elapsed + delay > retry.deadline:
+                    logging.debug("RequestFailed: endpoint: {}, attempt: {}, error: {}".format(endpoint, attempt, error))
+                    raise
+                if metrics is not None:
+                    metrics.retry(path)
+                logging.debug("RetryScheduled: endpoint: {}, attempt: {}, delay: {:.3f}, error: {}".format(endpoint, attempt, delay, error))
+                await asyncio.sleep(delay)
+                if getattr(error, "code", None) == -1021:
+                    await self.um_sync_time()
+
+    async def um_server_time(
+            self,
+            retry: RetryPolicy = None
+        ) -> int:
+        endpoint = self.base_url + "/fapi/v1/time"
+        return (await self._request("GET", endpoint, retry= retry))["serverTime"]
+
+    async def um_sync_time(
+            self,
+            samples: int = 3
+        ) -> int:
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.ensure_future(self._sync_time(samples))
+        return await asyncio.shield(self._sync_task)
+
+    async def _sync_time(self, samples: int) -> int:
+        measured = []
+        for _ in range(samples):
+            sent = time.time()
+            server_time = await self.um_server_time()
+            measured.append((sent, time.time(), server_time))
+        self.signer.update(measured)
+        return self.signer.offset
+
+    async def um_klines(
+            self,
+            symbol: str,
+            interval: str,
+            limit: int,
+            start,
+            end,
+            extended: bool = False,
+            raw: bool = False,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/klines"
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start != None and end != None:
+            params.update({"startTime": start, "endTime": end})
+        decode = decode_klines if raw else klines_frame
+        return await self._request("GET", endpoint, params, retry= retry, decode= lambda data: decode(data, extended))
+
+    async def um_mark_klines(
+            self,
+            symbol: str,
+            interval: str,
+            limit: int,
+            start,
+            end,
+            extended: bool = False,
+            raw: bool = False,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/markPriceKlines"
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start != None and end != None:
+            params.update({"startTime": start, "endTime": end})
+        decode = decode_klines if raw else klines_frame
+        return await self._request("GET", endpoint, params, retry= retry, decode= lambda data: decode(data, extended))
+
+    async def _klines_range(
+            self,
+            fetch,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int,
+            limit: int,
+            workers: int
+        ) -> pd.DataFrame:
+        pages = kline_pages(interval, start, end, limit)
+        semaphore = asyncio.Semaphore(workers)
+        async def fetch_page(page):
+            async with semaphore:
+                return await fetch(symbol, interval, limit, page[0], page[1])
+        frames = await asyncio.gather(*[fetch_page(page) for page in pages])
+        return merge_pages(frames)
+
+    async def um_klines_range(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int = None,
+            limit: int = 499,
+            workers: int = 32
+        ) -> pd.DataFrame:
+        return await self._klines_range(self.um_klines, symbol, interval, start, end, limit, workers)
+
+    async def um_mark_klines_range(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int = None,
+            limit: int = 499,
+            workers: int = 32
+        ) -> pd.DataFrame:
+        return await self._klines_range(self.um_mark_klines, symbol, interval, start, end, limit, workers)
+
+    async def um_klines_cached(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int = None,
+            workers: int = 32
+        ) -> pd.DataFrame:
+        now = int(time.time() * 1000)
+        end = now if end is None else min(int(end), now)
+        # weekly candles open on Monday, so the open candle is found by bucket, not by epoch multiples
+        closed_end = int(bucket_start(now, interval)) - 1
+        if self.store is None:
+            return await self.um_klines_range(symbol, interval, start, end, workers= workers)
+        for gap_start, gap_end in self.store.gaps(symbol, interval, start, min(end, closed_end)):
+            candels = await self.um_klines_range(symbol, interval, gap_start, gap_end, workers= workers)
+            candels = candels.loc[candels["close_time"] <= pd.Timestamp(closed_end, unit= "ms", tz= "UTC")]
+            self.store.write(symbol, interval, candels, covered= (gap_start, gap_end))
+        return self.store.read(symbol, interval, start, min(end, closed_end))
+
+    async def um_funding(
+            self,
+            symbol: str,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/premiumIndex"
+        return await self._request("GET", endpoint, {"symbol": symbol}, retry= retry, decode= funding_frame)
+
+    async def um_funding_all(
+            self,
+            symbols: list = None,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/premiumIndex"
+        funding_rates = await self._request("GET", endpoint, {}, retry= retry, decode= funding_table)
+        if symbols is not None:
+            funding_rates = funding_rates.loc[funding_rates.index.isin(symbols)]
+        return funding_rates
+
+    async def um_position(
+            self,
+            symbol: str,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v2/positionRisk"
+        params = {"symbol": symbol, "recvWindow": 10000}
+        return await self._request("GET", endpoint, params, signed= True, retry= retry, decode= position_frame)
+
+    async def um_portfolio(
+            self,
+            include_zero: bool = False,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v2/account"
+        params = {"recvWindow": 10000}
+        return await self._request("GET", endpoint, params, signed= True, retry= retry, decode= lambda data: portfolio_frame(data, include_zero))
+
+    async def um_position_risk(
+            self,
+            symbol: str = None,
+            retry: RetryPolicy = None
+        ) -> list:
+        endpoint = self.base_url + "/fapi/v2/positionRisk"
+        params = {"recvWindow": 10000} if symbol is None else {"symbol": symbol, "recvWindow": 10000}
+        return await self._request("GET", endpoint, params, signed= True, retry= retry)
+
+    async def um_balance(
+            self,
+            retry: RetryPolicy = None
+        ) -> list:
+        endpoint = self.base_url + "/fapi/v2/balance"
+        return await self._request("GET", endpoint, {}, signed= True, retry= retry)
+
+    async def um_listen_key(
+            self,
+            retry: RetryPolicy = None
+        ) -> str:
+        endpoint = self.base_url + "/fapi/v1/listenKey"
+        return (await self._request("POST", endpoint, retry= retry))["listenKey"]
+
+    async def um_keepalive_listen_key(
+            self,
+            retry: RetryPolicy = None
+        ) -> None:
+        endpoint = self.base_url + "/fapi/v1/listenKey"
+        await self._request("PUT", endpoint, retry= retry)
+        return None
+
+    async def um_close_listen_key(
+            self,
+            retry: RetryPolicy = None
+        ) -> None:
+        endpoint = self.base_url + "/fapi/v1/listenKey"
+        await self._request("DELETE", endpoint, retry= retry)
+        return None
+
+    async def um_refresh_info(
+            self,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/exchangeInfo"
+        info = await self._request("GET", endpoint, retry= retry)
+        symbols = {i["symbol"]: i for i in info["symbols"]}
+        self._symbols, self._filters = symbols, {name: symbol_filters(i) for name, i in symbols.items()}
+        self._info_time = time.monotonic()
+        return self._symbols
+
+    def _info_expired(self) -> bool:
+        return self._info_time is None or time.monotonic() - self._info_time > self.info_ttl
+
+    async def um_info(
+            self,
+            symbol: str,
+            refresh: bool = False
+        ) -> dict:
+        if self._info_lock is None:
+            self._info_lock = asyncio.Lock()
+        if refresh or self._info_expired():
+            async with self._info_lock:
+                if refresh or self._info_expired():
+                    await self.um_refresh_info()
+        return self._symbols.get(symbol, {})
+
+    async def um_filters(
+            self,
+            symbol: str,
+            refresh: bool = False
+        ) -> dict:
+        await self.um_info(symbol, refresh= refresh)
+        return self._filters[symbol]
+
+    async def um_open_orders(
+            self,
+            symbol: str = None,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/openOrders"
+        params = {} if symbol is None else {"symbol": symbol}
+        return await self._request("GET", endpoint, params, signed= True, retry= retry, decode= pd.DataFrame)
+
+    async def um_modify_margin(
+            self,
+            symbol: str,
+            type: int,
+            amt: float,
+            position: str,
+            retry: RetryPolicy = None
+        ) -> None:
+        endpoint = self.base_url + "/fapi/v1/positionMargin"
+        params = {"symbol": symbol, "type": type, "amount": amt, "positionSide": position}
+        await self._request("POST", endpoint, params, signed= True, retry= retry)
+        return None
+
+    async def um_query_order(
+            self,
+            symbol: str,
+            client_order_id: str = None,
+            order_id: int = None,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        params = {"symbol": symbol, "orderId": order_id} if order_id is not None else {"symbol": symbol, "origClientOrderId": client_order_id}
+        return self.orders.update(await self._request("GET", endpoint, params, signed= True, retry= retry))
+
+    async def um_search_order(
+            self,
+            symbol: str,
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        try:
+            order = await self.um_query_order(symbol, client_order_id= client_order_id, retry= retry)
+        except ClientError as error:
+            if error.code != -2013:
+                raise
+            return pd.DataFrame()
+        return pd.DataFrame([order])
+
+    async def _order(
+            self,
+            params: dict,
+            retry: RetryPolicy
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        self.orders.submitted(params)
+        try:
+            ack = await self._request("POST", endpoint, params, signed= True, retry= retry)
+        except TradingAPIError as error:
+            self.orders.failed(params.get("newClientOrderId"), error)
+            raise
+        self.orders.update(ack)
+        return order_ack(ack)
+
+    async def um_market_order(
+            self,
+            symbol: str,
+            side: str,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        qty_precision = (await self.um_filters(symbol))["qty_precision"]
+        return await self._order({
+            "symbol": symbol,
+            "quantity": np.round(qty, qty_precision),
+            "side": side,
+            "positionSide": position,
+            "type": "MARKET",
+            "newClientOrderId": client_order_id
+        }, retry)
+
+    async def um_limit_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        filters = await self.um_filters(symbol)
+        return await self._order({
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "price": np.round(price, filters["price_precision"]),
+            "side": side,
+            "positionSide": position,
+            "type": "LIMIT",
+            "timeInForce": "GTC",
+            "newClientOrderId": client_order_id
+        }, retry)
+
+    async def um_stop_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        filters = await self.um_filters(symbol)
+        return await self._order({
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "stopPrice": np.round(price, filters["price_precision"]),
+            "side": side,
+            "positionSide": position,
+            "type": "STOP_MARKET",
+            "newClientOrderId": client_order_id
+        }, retry)
+
+    async def um_take_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        filters = await self.um_filters(symbol)
+        return await self._order({
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "stopPrice": np.round(price, filters["price_precision"]),
+            "side": side,
+            "positionSide": position,
+            "type": "TAKE_PROFIT_MARKET",
+            "newClientOrderId": client_order_id
+        }, retry)
+
+    async def _batch_post(
+            self,
+            chunk: list,
+            retry: RetryPolicy
+        ) -> list:
+        endpoint = self.base_url + "/fapi/v1/batchOrders"
+        params = {"batchOrders": json.dumps(chunk, separators= (",", ":"))}
+        for payload in chunk:
+            self.orders.submitted(payload)
+        try:
+            results = await self._request("POST", endpoint, params, signed= True, retry= retry)
+        except TradingAPIError as error:
+            for payload in chunk:
+                self.orders.failed(payload.get("newClientOrderId"), error)
+            # a failed chunk must not hide the acks of the chunks that went through
+            return batch_error_rows(chunk, error)
+        for payload, result in zip(chunk, results):
+            self.orders.record(payload, result)
+        return results
+
+    async def um_batch_orders(
+            self,
+            orders,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        orders = pd.DataFrame(orders)
+        filters = {symbol: await self.um_filters(symbol) for symbol in orders["symbol"].unique()}
+        payloads = order_payloads(orders, filters)
+        chunks = [payloads[i: i + 5] for i in range(0, len(payloads), 5)]
+        responses = await asyncio.gather(*[self._batch_post(chunk, retry) for chunk in chunks])
+        return pd.DataFrame([result for response in responses for result in response])
+
+    async def um_grid_orders(
+            self,
+            symbol: str,
+            side: str,
+            prices,
+            qtys,
+            position: str,
+            order_type: str = "LIMIT",
+            client_order_ids: list = None,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        prices = np.asarray(prices, dtype= "float64")
+        orders = pd.DataFrame({
+            "symbol": symbol,
+            "side": side,
+            "positionSide": position,
+            "type": order_type,
+            "quantity": np.broadcast_to(np.asarray(qtys, dtype= "float64"), prices.shape),
+            "price" if order_type == "LIMIT" else "stopPrice": prices
+        })
+        if client_order_ids is not None:
+            orders["newClientOrderId"] = client_order_ids
+        return await self.um_batch_orders(orders, retry= retry)
+
+    async def um_batch_cancel(
+            self,
+            symbol: str,
+            order_ids: list = None,
+            client_order_ids: list = None,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/batchOrders"
+        if order_ids is not None:
+            key, ids = "orderIdList", [int(order_id) for order_id in order_ids]
+        else:
+            key, ids = "origClientOrderIdList", [str(client_order_id) for client_order_id in client_order_ids]
+        chunks = [ids[i: i + 10] for i in range(0, len(ids), 10)]
+        responses = await asyncio.gather(*[
+            self._request("DELETE", endpoint, {"symbol": symbol, key: json.dumps(chunk, separators= (",", ":"))}, signed= True, retry= retry)
+            for chunk in chunks
+        ])
+        results = [result for response in responses for result in response]
+        for result in results:
+            if "orderId" in result:
+                self.orders.update(result)
+        return pd.DataFrame(results)
+
+    async def um_cancel_order(
+            self,
+            symbol: str,
+            order_id: int,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        ack = await self._request("DELETE", endpoint, {"symbol": symbol, "orderId": order_id}, signed= True, retry= retry)
+        self.orders.update(ack)
+        return order_ack(ack)
+
+    async def um_cancel_all(
+            self,
+            symbol: str,
+            retry: RetryPolicy = None
+        ) -> None:
+        endpoint = self.base_url + "/fapi/v1/allOpenOrders"
+        await self._request("DELETE", endpoint, {"symbol": symbol}, signed= True, retry= retry)
+        self.orders.canceled_all(symbol)
+        return None
+
+    async def um_modify_order(
+            self,
+            client_order_id: str,
+            symbol: str,
+            side: str,
+            qty: float,
+            price: float,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        filters = await self.um_filters(symbol)
+        params = {
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "price": np.round(price, filters["price_precision"]),
+            "side": side,
+            "origClientOrderId": client_order_id
+        }
+        ack = await self._request("PUT", endpoint, params, signed= True, retry= retry)
+        self.orders.update(ack)
+        return order_ack(ack)
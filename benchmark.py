@@ -0,0 +1,163 @@
+import argparse
+import json
+import os
+import sys
+import time
+import numpy as np
+from mockServer import MockServer
+from metrics import Metrics
+from tradingAPI import TRADING_API, RateLimiter, RetryPolicy, TradingAPIError, decode_klines, klines_frame
+
+def result(
+        name: str,
+        value: float,
+        unit: str,
+        better: str = "lower"
+    ) -> dict:
+    return {"name": name, "value": float(value), "unit": unit, "better": better}
+
+def timed(call, rounds: int) -> np.ndarray:
+    samples = np.empty(rounds)
+    for i in range(rounds):
+        started = time.perf_counter()
+        call()
+        samples[i] = time.perf_counter() - started
+    return samples
+
+def latency_results(name: str, samples: np.ndarray) -> list:
+    return [
+        result(name + ".p50", np.percentile(samples, 50) * 1000, "ms"),
+        result(name + ".p99", np.percentile(samples, 99) * 1000, "ms")
+    ]
+
+def unlimited() -> RateLimiter:
+    return RateLimiter(weight_limit= 10 ** 9, order_limit_10s= 10 ** 9, order_limit_1m= 10 ** 9)
+
+def bench_latency(server: MockServer, rounds: int) -> list:
+    results = []
+    with TRADING_API("mock", "mock", os.devnull, base_url= server.url, limiter= unlimited()) as api:
+        api.um_refresh_info()
+        calls = {
+            "latency.klines_100": lambda: api.um_klines("BTCUSDT", "1m", 100, None, None),
+            "latency.funding": lambda: api.um_funding("BTCUSDT"),
+            "latency.position": lambda: api.um_position("BTCUSDT"),
+            "latency.open_orders": lambda: api.um_open_orders("BTCUSDT"),
+            "latency.exchange_info": api.um_refresh_info
+        }
+        for name, call in calls.items():
+            call()
+            results += latency_results(name, timed(call, rounds))
+    return results
+
+def bench_decode(server: MockServer, rounds: int) -> list:
+    status, data = server.state.klines({"symbol": "BTCUSDT", "interval": "1m", "limit": 1500})
+    payload = json.dumps(data).encode()
+    return [
+        result("decode.json_1500", np.median(timed(lambda: json.loads(payload), rounds)) * 1e6, "us"),
+        result("decode.frame_1500", np.median(timed(lambda: klines_frame(data), rounds)) * 1e6, "us"),
+        result("decode.raw_1500", np.median(timed(lambda: decode_klines(data), rounds)) * 1e6, "us")
+    ]
+
+def bench_orders(server: MockServer, rounds: int) -> list:
+    results = []
+    with TRADING_API("mock", "mock", os.devnull, base_url= server.url, limiter= unlimited()) as api:
+        api.um_refresh_info()
+        started = time.perf_counter()
+        for i in range(rounds):
+            api.um_limit_order("BTCUSDT", "BUY", 0.001, 50000 - i, "LONG", "bench{}".format(i))
+        results.append(result("orders.single_per_s", rounds / (time.perf_counter() - started), "orders/s", "higher"))
+        api.um_cancel_all("BTCUSDT")
+        prices = 50000 - np.arange(rounds) * 0.5
+        started = time.perf_counter()
+        api.um_grid_orders("BTCUSDT", "BUY", prices, 0.001, "LONG")
+        results.append(result("orders.batch_per_s", rounds / (time.perf_counter() - started), "orders/s", "higher"))
+        api.um_cancel_all("BTCUSDT")
+    return results
+
+def bench_rate_limited(server: MockServer, rounds: int) -> list:
+    metrics = Metrics()
+    retry = RetryPolicy(max_attempts= 10, backoff= 0.05, max_backoff= 0.5)
+    server.inject("/fapi/v1/klines", status= 429, count= rounds, probability= 0.2, retry_after= 0)
+    failures = 0
+    with TRADING_API("mock", "mock", os.devnull, base_url= server.url, limiter= unlimited(), retry= retry, metrics= metrics) as api:
+        started = time.perf_counter()
+        for i in range(rounds):
+            try:
+                api.um_klines("BTCUSDT", "1m", 100, None, None)
+            except TradingAPIError:
+                failures += 1
+        elapsed = time.perf_counter() - started
+    server.clear_faults()
+    retries = metrics.snapshot().get("/fapi/v1/klines", {}).get("retries", 0)
+    return [
+        result("rate_limited.call_ms", elapsed / rounds * 1000, "ms"),
+        result("rate_limited.retries_per_call", retries / rounds, "retries"),
+        result("rate_limited.failures", failures, "calls")
+    ]
+
+BENCHMARKS = {
+    "latency": bench_latency,
+    "decode": bench_decode,
+    "orders": bench_orders,
+    "rate_limited": bench_rate_limited
+}
+
+def run(
+        names: list = None,
+        rounds: int = 100,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        fixtures: str = None
+    ) -> list:
+    results = []
+    with MockServer(latency= latency, jitter= jitter, fixtures= fixtures, weight_limit= 10 ** 9) as server:
+        for name in (names or BENCHMARKS):
+            results += BENCHMARKS[name](server, rounds)
+    return results
+
+def compare(
+        results: list,
+        baseline: list,
+        tolerance: float
+    ) -> list:
+    previous = {entry["name"]: entry for entry in baseline}
+    regressions = []
+    for entry in results:
+        old = previous.get(entry["name"])
+        if old is None or old["value"] == 0:
+            continue
+        change = entry["value"] / old["value"] - 1
+        if (entry["better"] == "lower" and change > tolerance) or (entry["better"] == "higher" and change < -tolerance):
+            regressions.append(dict(entry, baseline= old["value"], change= change))
+    return regressions
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description= "Offline TRADING_API benchmarks against a local mock fapi server.")
+    parser.add_argument("benchmarks", nargs= "*", help= "benchmarks to run: {} (default: all)".format(", ".join(BENCHMARKS)))
+    parser.add_argument("--rounds", type= int, default= 100)
+    parser.add_argument("--latency", type= float, default= 0.0, help= "server-side delay per response in seconds")
+    parser.add_argument("--jitter", type= float, default= 0.0, help= "uniform extra delay per response in seconds")
+    parser.add_argument("--fixtures", default= None, help= "directory of recorded responses to replay")
+    parser.add_argument("--json", default= None, help= "write results to this file")
+    parser.add_argument("--baseline", default= None, help= "results file to compare against")
+    parser.add_argument("--tolerance", type= float, default= 0.25, help= "allowed relative regression")
+    args = parser.parse_args(argv)
+    unknown = [name for name in args.benchmarks if name not in BENCHMARKS]
+    if unknown:
+        parser.error("unknown benchmarks: {}".format(", ".join(unknown)))
+    results = run(args.benchmarks, args.rounds, args.latency, args.jitter, args.fixtures)
+    for entry in results:
+        print("{:<36} {:>12.3f} {}".format(entry["name"], entry["value"], entry["unit"]))
+    if args.json is not None:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent= 2)
+    if args.baseline is not None:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for entry in regressions:
+            print("REGRESSION {}: {:.3f} -> {:.3f} {} ({:+.0%})".format(entry["name"], entry["baseline"], entry["value"], entry["unit"], entry["change"]))
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
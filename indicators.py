@@ -0,0 +1,346 @@
+import copy
+import logging
+import math
+import threading
+from collections import deque
+import numpy as np
+import pandas as pd
+from klineResampler import bucket_start, frame_arrays, take
+
+def ema(values, com: float) -> np.ndarray:
+    return pd.Series(np.asarray(values, dtype= "float64")).ewm(com= com, adjust= False).mean().to_numpy()
+
+def ema_step(
+        previous: float,
+        value: float,
+        alpha: float
+    ) -> float:
+    if previous is None:
+        return value
+    # same arithmetic as pandas' adjust=False kernel so batch and incremental values are bit-identical
+    if previous != value:
+        return ((1.0 - alpha) * previous + alpha * value) / ((1.0 - alpha) + alpha)
+    return previous
+
+def session_cumsum(
+        values: np.ndarray,
+        starts: np.ndarray
+    ) -> np.ndarray:
+    sums = np.empty_like(values)
+    bounds = np.r_[starts, len(values)]
+    for start, end in zip(bounds[:-1], bounds[1:]):
+        sums[start:end] = np.cumsum(values[start:end])
+    return sums
+
+def row_at(
+        arrays: dict,
+        i: int
+    ) -> dict:
+    return {column: values[i].item() for column, values in arrays.items()}
+
+class Indicator:
+    names = ()
+
+    def reset(self) -> None:
+        raise NotImplementedError
+
+    def batch(self, arrays: dict) -> dict:
+        raise NotImplementedError
+
+    def warm(self, arrays: dict) -> None:
+        raise NotImplementedError
+
+    def value(self, row: dict) -> dict:
+        raise NotImplementedError
+
+    def commit(self, row: dict) -> None:
+        raise NotImplementedError
+
+class EMA(Indicator):
+    def __init__(
+            self,
+            span: int,
+            column: str = "close",
+            name: str = None
+        ) -> None:
+        self.com = (span - 1) / 2
+        self.alpha = 1.0 / (1.0 + self.com)
+        self.column = column
+        self.names = (name or "ema_{}".format(span),)
+        self.reset()
+
+    def reset(self) -> None:
+        self.last = None
+
+    def batch(self, arrays: dict) -> dict:
+        return {self.names[0]: ema(arrays[self.column], self.com)}
+
+    def warm(self, arrays: dict) -> None:
+        values = self.batch(arrays)[self.names[0]]
+        self.last = float(values[-1]) if len(values) else None
+
+    def value(self, row: dict) -> dict:
+        return {self.names[0]: ema_step(self.last, float(row[self.column]), self.alpha)}
+
+    def commit(self, row: dict) -> None:
+        self.last = ema_step(self.last, float(row[self.column]), self.alpha)
+
+class ATR(Indicator):
+    def __init__(
+            self,
+            period: int = 14,
+            name: str = None
+        ) -> None:
+        self.com = period - 1.0
+        self.alpha = 1.0 / (1.0 + self.com)
+        self.names = (name or "atr_{}".format(period),)
+        self.reset()
+
+    def reset(self) -> None:
+        self.close = None
+        self.last = None
+
+    def true_range(self, row: dict) -> float:
+        high, low = float(row["high"]), float(row["low"])
+        if self.close is None:
+            return high - low
+        return max(high - low, abs(high - self.close), abs(low - self.close))
+
+    def batch(self, arrays: dict) -> dict:
+        high = np.asarray(arrays["high"], dtype= "float64")
+        low = np.asarray(arrays["low"], dtype= "float64")
+        previous = np.r_[np.nan, np.asarray(arrays["close"], dtype= "float64")[:-1]]
+        true_range = np.fmax(high - low, np.fmax(np.abs(high - previous), np.abs(low - previous)))
+        return {self.names[0]: ema(true_range, self.com)}
+
+    def warm(self, arrays: dict) -> None:
+        values = self.batch(arrays)[self.names[0]]
+        if len(values):
+            self.close, self.last = float(arrays["close"][-1]), float(values[-1])
+
+    def value(self, row: dict) -> dict:
+        return {self.names[0]: ema_step(self.last, self.true_range(row), self.alpha)}
+
+    def commit(self, row: dict) -> None:
+        self.last = ema_step(self.last, self.true_range(row), self.alpha)
+        self.close = float(row["close"])
+
+class VWAP(Indicator):
+    def __init__(
+            self,
+            anchor: str = "1d",
+            name: str = "vwap"
+        ) -> None:
+        self.anchor = anchor
+        self.names = (name,)
+        self.reset()
+
+    def reset(self) -> None:
+        self.session = None
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def sums(self, arrays: dict) -> tuple:
+        high = np.asarray(arrays["high"], dtype= "float64")
+        low = np.asarray(arrays["low"], dtype= "float64")
+        close = np.asarray(arrays["close"], dtype= "float64")
+        volume = np.asarray(arrays["volume"], dtype= "float64")
+        sessions = bucket_start(np.asarray(arrays["open_time"], dtype= "int64"), self.anchor)
+        starts = np.flatnonzero(np.r_[True, sessions[1:] != sessions[:-1]]) if len(sessions) else np.empty(0, dtype= "int64")
+        return sessions, session_cumsum((high + low + close) / 3.0 * volume, starts), session_cumsum(volume, starts)
+
+    def batch(self, arrays: dict) -> dict:
+        _, price_volume, volume = self.sums(arrays)
+        return {self.names[0]: np.divide(price_volume, volume, out= np.full(volume.shape, np.nan), where= volume > 0)}
+
+    def warm(self, arrays: dict) -> None:
+        sessions, price_volume, volume = self.sums(arrays)
+        if len(sessions):
+            self.session, self.price_volume, self.volume = int(sessions[-1]), float(price_volume[-1]), float(volume[-1])
+
+    def step(self, row: dict) -> tuple:
+        session = bucket_start(int(row["open_time"]), self.anchor)
+        price_volume, volume = (self.price_volume, self.volume) if session == self.session else (0.0, 0.0)
+        high, low, close, row_volume = float(row["high"]), float(row["low"]), float(row["close"]), float(row["volume"])
+        return session, price_volume + (high + low + close) / 3.0 * row_volume, volume + row_volume
+
+    def value(self, row: dict) -> dict:
+        _, price_volume, volume = self.step(row)
+        return {self.names[0]: price_volume / volume if volume > 0 else math.nan}
+
+    def commit(self, row: dict) -> None:
+        self.session, self.price_volume, self.volume = self.step(row)
+
+class Rolling(Indicator):
+    def __init__(
+            self,
+            window: int,
+            column: str = "close",
+            name: str = None
+        ) -> None:
+        self.window = window
+        self.column = column
+        name = name or "{}_{}".format(column, window)
+        self.names = (name + "_mean", name + "_std")
+        self.reset()
+
+    def reset(self) -> None:
+        self.reference = None
+        self.sum = 0.0
+        self.square = 0.0
+        self.sums = deque([0.0], maxlen= self.window)
+        self.squares = deque([0.0], maxlen= self.window)
+
+    def prefix(self, arrays: dict) -> tuple:
+        values = np.asarray(arrays[self.column], dtype= "float64")
+        reference = values[0] if len(values) else 0.0
+        deviation = values - reference
+        return float(reference), np.r_[0.0, np.cumsum(deviation)], np.r_[0.0, np.cumsum(deviation * deviation)]
+
+    def stats(
+            self,
+            window_sum,
+            window_square,
+            reference: float
+        ) -> tuple:
+        mean = window_sum / self.window + reference
+        if self.window < 2:
+            return mean, window_sum * math.nan
+        variance = (window_square - window_sum * window_sum / self.window) / (self.window - 1)
+        return mean, np.sqrt(np.maximum(variance, 0.0))
+
+    def batch(self, arrays: dict) -> dict:
+        reference, sums, squares = self.prefix(arrays)
+        window_sum = np.full(len(sums) - 1, np.nan)
+        window_square = np.full(len(sums) - 1, np.nan)
+        window_sum[self.window - 1:] = sums[self.window:] - sums[:len(sums) - self.window]
+        window_square[self.window - 1:] = squares[self.window:] - squares[:len(squares) - self.window]
+        mean, std = self.stats(window_sum, window_square, reference)
+        return {self.names[0]: mean, self.names[1]: std}
+
+    def warm(self, arrays: dict) -> None:
+        reference, sums, squares = self.prefix(arrays)
+        if len(sums) > 1:
+            self.reference, self.sum, self.square = reference, float(sums[-1]), float(squares[-1])
+            self.sums = deque(sums[-self.window:].tolist(), maxlen= self.window)
+            self.squares = deque(squares[-self.window:].tolist(), maxlen= self.window)
+
+    def step(self, row: dict) -> tuple:
+        value = float(row[self.column])
+        reference = value if self.reference is None else self.reference
+        deviation = value - reference
+        return reference, self.sum + deviation, self.square + deviation * deviation
+
+    def value(self, row: dict) -> dict:
+        reference, total, square = self.step(row)
+        if len(self.sums) < self.window:
+            return {self.names[0]: math.nan, self.names[1]: math.nan}
+        mean, std = self.stats(total - self.sums[0], square - self.squares[0], reference)
+        return {self.names[0]: float(mean), self.names[1]: float(std)}
+
+    def commit(self, row: dict) -> None:
+        self.reference, self.sum, self.square = self.step(row)
+        self.sums.append(self.sum)
+        self.squares.append(self.square)
+
+class IndicatorEngine:
+    def __init__(self, indicators: list) -> None:
+        self.indicators = list(indicators)
+        self.names = [name for indicator in self.indicators for name in indicator.names]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("duplicate indicator names: {}".format(self.names))
+        self.states = {}
+        self.pending = {}
+        self.latest = {}
+        self._lock = threading.Lock()
+
+    def batch(self, candels) -> pd.DataFrame:
+        arrays = frame_arrays(candels)
+        values = {}
+        for indicator in self.indicators:
+            values.update(indicator.batch(arrays))
+        index = candels.index if isinstance(candels, pd.DataFrame) else None
+        return pd.DataFrame(values, index= index, columns= self.names)
+
+    def _set_pending(
+            self,
+            key: tuple,
+            row: dict
+        ) -> None:
+        self.pending[key] = row
+        latest = {}
+        for indicator in self.states[key]:
+            latest.update(indicator.value(row))
+        self.latest[key] = latest
+
+    def _warm(
+            self,
+            key: tuple,
+            arrays: dict
+        ) -> None:
+        indicators = copy.deepcopy(self.indicators)
+        for indicator in indicators:
+            indicator.reset()
+        committed = take(arrays, slice(0, -1))
+        if len(committed["open_time"]):
+            for indicator in indicators:
+                indicator.warm(committed)
+        self.states[key] = indicators
+        self._set_pending(key, row_at(arrays, -1))
+
+    def update(
+            self,
+            symbol: str,
+            interval: str,
+            candels
+        ) -> dict:
+        key = (symbol, interval)
+        arrays = frame_arrays(candels)
+        if len(arrays.get("open_time", ())) == 0:
+            return self.values(symbol, interval)
+        arrays = take(arrays, np.argsort(arrays["open_time"], kind= "stable"))
+        with self._lock:
+            pending = self.pending.get(key)
+            if pending is None:
+                self._warm(key, arrays)
+                return dict(self.latest[key])
+            fresh = arrays["open_time"] >= pending["open_time"]
+            if not fresh.all():
+                logging.debug("IndicatorEngine: dropped {} candles older than the open candle of {} {}".format(int((~fresh).sum()), symbol, interval))
+                arrays = take(arrays, fresh)
+            for i in range(len(arrays["open_time"])):
+                row = row_at(arrays, i)
+                if row["open_time"] > pending["open_time"]:
+                    for indicator in self.states[key]:
+                        indicator.commit(pending)
+                pending = row
+            self._set_pending(key, pending)
+            return dict(self.latest[key])
+
+    def values(
+            self,
+            symbol: str,
+            interval: str
+        ) -> dict:
+        with self._lock:
+            return dict(self.latest.get((symbol, interval), {}))
+
+    def reset(
+            self,
+            symbol: str = None,
+            interval: str = None
+        ) -> None:
+        with self._lock:
+            for key in list(self.states):
+                if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval):
+                    del self.states[key], self.pending[key], self.latest[key]
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            keys = list(self.latest)
+            rows = [self.latest[key] for key in keys]
+            times = [self.pending[key]["open_time"] for key in keys]
+        index = pd.MultiIndex.from_tuples(keys, names= ["symbol", "interval"]) if keys else pd.MultiIndex.from_arrays([[], []], names= ["symbol", "interval"])
+        frame = pd.DataFrame(rows, index= index, columns= self.names)
+        frame.insert(0, "open_time", pd.to_datetime(np.asarray(times, dtype= "int64"), unit= "ms", utc= True))
+        return frame
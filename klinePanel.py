@@ -0,0 +1,196 @@
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+from klineResampler import bucket_start, concat, frame_arrays
+from tradingAPI import INTERVAL_MS, KLINE_EXTENDED, decode_klines, kline_pages
+
+PANEL_FIELDS = ("open", "high", "low", "close", "volume")
+
+class KlinePanel:
+    def __init__(
+            self,
+            symbols: list,
+            interval: str,
+            times: np.ndarray,
+            data: np.ndarray,
+            valid: np.ndarray,
+            fields: tuple = PANEL_FIELDS,
+            errors: dict = None
+        ) -> None:
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.times = times
+        self.fields = tuple(fields)
+        # stored field-major so every field is one contiguous symbols x time block
+        self.data = data
+        self.valid = valid
+        self.errors = {} if errors is None else errors
+        self._symbol_index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+
+    @classmethod
+    def from_candels(
+            cls,
+            candels: dict,
+            interval: str,
+            fields: tuple = PANEL_FIELDS,
+            dtype: str = "float64",
+            start: int = None,
+            end: int = None,
+            errors: dict = None
+        ) -> "KlinePanel":
+        step = INTERVAL_MS[interval]
+        symbols = list(candels)
+        arrays = [frame_arrays(candels[symbol]) for symbol in symbols]
+        opens = [np.asarray(symbol_arrays.get("open_time", ()), dtype= "int64") for symbol_arrays in arrays]
+        present = [open_time for open_time in opens if len(open_time)]
+        if start is not None:
+            first = int(bucket_start(int(start) + step - 1, interval))
+        else:
+            first = min(int(open_time[0]) for open_time in present) if present else 0
+        if end is not None:
+            last = int(bucket_start(int(end), interval))
+        else:
+            last = max(int(open_time[-1]) for open_time in present) if present else first - step
+        times = np.arange(first, last + 1, step, dtype= "int64")
+        data = np.full((len(fields), len(symbols), len(times)), np.nan, dtype= dtype)
+        valid = np.zeros((len(symbols), len(times)), dtype= bool)
+        for row, (symbol_arrays, open_time) in enumerate(zip(arrays, opens)):
+            offset = open_time - first
+            keep = (offset >= 0) & (offset % step == 0) & (open_time <= last)
+            slots = offset[keep] // step
+            for column, field in enumerate(fields):
+                data[column, row, slots] = symbol_arrays[field][keep]
+            valid[row, slots] = True
+        return cls(symbols, interval, times, data, valid, fields, errors)
+
+    @property
+    def values(self) -> np.ndarray:
+        return np.moveaxis(self.data, 0, -1)
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + self.valid.nbytes + self.times.nbytes
+
+    def index(self) -> pd.DatetimeIndex:
+        return pd.DatetimeIndex(pd.to_datetime(self.times, unit= "ms", utc= True), name= "open_time")
+
+    def field(self, name: str) -> np.ndarray:
+        return self.data[self._field_index[name]]
+
+    def frame(self, field: str = "close") -> pd.DataFrame:
+        return pd.DataFrame(self.field(field).T, index= self.index(), columns= pd.Index(self.symbols, name= "symbol"), copy= False)
+
+    def mask(self) -> pd.DataFrame:
+        return pd.DataFrame(self.valid.T, index= self.index(), columns= pd.Index(self.symbols, name= "symbol"), copy= False)
+
+    def symbol_frame(
+            self,
+            symbol: str,
+            dropna: bool = False
+        ) -> pd.DataFrame:
+        row = self._symbol_index[symbol]
+        candels = pd.DataFrame(self.data[:, row, :].T, index= self.index(), columns= list(self.fields), copy= False)
+        return candels.loc[self.valid[row]] if dropna else candels
+
+    def select(
+            self,
+            symbols: list = None,
+            start: int = None,
+            end: int = None
+        ) -> "KlinePanel":
+        lower = 0 if start is None else int(np.searchsorted(self.times, int(start), side= "left"))
+        upper = len(self.times) if end is None else int(np.searchsorted(self.times, int(end), side= "right"))
+        data, valid = self.data[:, :, lower:upper], self.valid[:, lower:upper]
+        if symbols is not None:
+            rows = [self._symbol_index[symbol] for symbol in symbols]
+            data, valid = data[:, rows], valid[rows]
+        else:
+            symbols = self.symbols
+        errors = {symbol: error for symbol, error in self.errors.items() if symbol in symbols}
+        return KlinePanel(symbols, self.interval, self.times[lower:upper], data, valid, self.fields, errors)
+
+def panel_requests(
+        symbols: list,
+        interval: str,
+        start: int,
+        end: int,
+        limit: int
+    ) -> list:
+    if start is None and end is not None:
+        start = int(end) - (limit - 1) * INTERVAL_MS[interval]
+    if start is None:
+        return [(symbol, None, None) for symbol in symbols]
+    pages = kline_pages(interval, start, end, limit)
+    return [(symbol, page_start, page_end) for symbol in symbols for page_start, page_end in pages]
+
+def assemble_panel(
+        symbols: list,
+        requests: list,
+        results: list,
+        interval: str,
+        fields: tuple,
+        dtype: str,
+        start: int,
+        end: int
+    ) -> KlinePanel:
+    pages = {symbol: [] for symbol in symbols}
+    errors = {}
+    for (symbol, _, _), (arrays, error) in zip(requests, results):
+        if error is not None:
+            errors.setdefault(symbol, error)
+        else:
+            pages[symbol].append(arrays)
+    candels = {symbol: concat(parts) if parts else decode_klines([], True) for symbol, parts in pages.items()}
+    return KlinePanel.from_candels(candels, interval, fields, dtype, start, end, errors)
+
+def kline_panel(
+        api,
+        symbols: list,
+        interval: str,
+        start: int = None,
+        end: int = None,
+        limit: int = 499,
+        fields: tuple = PANEL_FIELDS,
+        dtype: str = "float64",
+        workers: int = 16
+    ) -> KlinePanel:
+    extended = any(field in KLINE_EXTENDED for field in fields)
+    requests = panel_requests(symbols, interval, start, end, limit)
+    def fetch(request):
+        symbol, page_start, page_end = request
+        try:
+            return api.um_klines(symbol, interval, limit, page_start, page_end, extended= extended, raw= True), None
+        except Exception as error:
+            logging.debug("kline_panel: symbol: {}, page: {}, error: {}".format(symbol, page_start, error))
+            return None, error
+    with ThreadPoolExecutor(max_workers= workers) as executor:
+        results = list(executor.map(fetch, requests))
+    return assemble_panel(symbols, requests, results, interval, fields, dtype, start, end)
+
+async def kline_panel_async(
+        api,
+        symbols: list,
+        interval: str,
+        start: int = None,
+        end: int = None,
+        limit: int = 499,
+        fields: tuple = PANEL_FIELDS,
+        dtype: str = "float64",
+        workers: int = 32
+    ) -> KlinePanel:
+    extended = any(field in KLINE_EXTENDED for field in fields)
+    requests = panel_requests(symbols, interval, start, end, limit)
+    semaphore = asyncio.Semaphore(workers)
+    async def fetch(request):
+        symbol, page_start, page_end = request
+        async with semaphore:
+            try:
+                return await api.um_klines(symbol, interval, limit, page_start, page_end, extended= extended, raw= True), None
+            except Exception as error:
+                logging.debug("kline_panel_async: symbol: {}, page: {}, error: {}".format(symbol, page_start, error))
+                return None, error
+    results = await asyncio.gather(*[fetch(request) for request in requests])
+    return assemble_panel(symbols, requests, results, interval, fields, dtype, start, end)
@@ -0,0 +1,153 @@
+import logging
+import time
+import numpy as np
+import pandas as pd
+from klineStore import to_ms
+from tradingAPI import INTERVAL_MS, arrays_frame, bucket_start, merge_pages
+
+SUM_COLUMNS = ("volume", "quote_volume", "trades", "taker_buy_volume", "taker_buy_quote_volume")
+
+def frame_arrays(candels) -> dict:
+    if isinstance(candels, dict):
+        return {column: np.asarray(values) for column, values in candels.items()}
+    arrays = {column: candels[column].to_numpy() for column in candels.columns}
+    arrays["open_time"] = to_ms(candels["open_time"])
+    arrays["close_time"] = to_ms(candels["close_time"])
+    return arrays
+
+def take(arrays: dict, index) -> dict:
+    return {column: values[index] for column, values in arrays.items()}
+
+def concat(parts: list) -> dict:
+    return {column: np.concatenate([part[column] for part in parts]) for column in parts[0]}
+
+def resample_arrays(
+        arrays: dict,
+        interval: str,
+        complete_head: bool = False
+    ) -> dict:
+    open_time = np.asarray(arrays["open_time"], dtype= "int64")
+    if len(open_time) == 0:
+        return dict(arrays)
+    buckets = bucket_start(open_time, interval)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    if complete_head and open_time[0] != buckets[0]:
+        starts = starts[1:]
+        if len(starts) == 0:
+            return take(arrays, slice(0, 0))
+        arrays = take(arrays, slice(starts[0], None))
+        buckets, starts = buckets[starts[0]:], starts - starts[0]
+    ends = np.r_[starts[1:], len(buckets)] - 1
+    resampled = {}
+    for column, values in arrays.items():
+        if column == "open_time":
+            resampled[column] = buckets[starts]
+        elif column == "close_time":
+            resampled[column] = buckets[starts] + INTERVAL_MS[interval] - 1
+        elif column == "open":
+            resampled[column] = values[starts]
+        elif column == "high":
+            resampled[column] = np.maximum.reduceat(values, starts)
+        elif column == "low":
+            resampled[column] = np.minimum.reduceat(values, starts)
+        elif column == "close":
+            resampled[column] = values[ends]
+        elif column in SUM_COLUMNS:
+            resampled[column] = np.add.reduceat(values, starts)
+    return resampled
+
+def resample_klines(
+        candels,
+        interval: str,
+        complete_head: bool = True
+    ) -> pd.DataFrame:
+    return arrays_frame(resample_arrays(frame_arrays(candels), interval, complete_head))
+
+class KlineResampler:
+    def __init__(
+            self,
+            intervals: list,
+            base_interval: str = "1m",
+            capacity: int = None
+        ) -> None:
+        base_step = INTERVAL_MS[base_interval]
+        for interval in intervals:
+            if INTERVAL_MS[interval] % base_step != 0:
+                raise ValueError("{} is not a multiple of {}".format(interval, base_interval))
+        self.intervals = list(intervals)
+        self.base_interval = base_interval
+        self.capacity = capacity
+        self.tail = None
+        self.resampled = {interval: None for interval in self.intervals}
+
+    def update(self, candels) -> None:
+        arrays = frame_arrays(candels)
+        if len(arrays["open_time"]) == 0:
+            return
+        arrays = take(arrays, np.argsort(arrays["open_time"], kind= "stable"))
+        if self.tail is not None and len(self.tail["open_time"]):
+            fresh = arrays["open_time"] >= self.tail["open_time"][0]
+            if not fresh.all():
+                logging.debug("KlineResampler: dropped {} base candles older than the open buckets".format(int((~fresh).sum())))
+                arrays = take(arrays, fresh)
+                if len(arrays["open_time"]) == 0:
+                    return
+            merged = concat([self.tail, arrays])
+            reverse = merged["open_time"][::-1]
+            _, keep = np.unique(reverse, return_index= True)
+            merged = take(merged, len(reverse) - 1 - keep)
+        else:
+            merged = arrays
+        first = arrays["open_time"][0]
+        for interval in self.intervals:
+            since = bucket_start(first, interval)
+            previous = self.resampled[interval]
+            empty = previous is None or len(previous["open_time"]) == 0
+            fresh = resample_arrays(take(merged, merged["open_time"] >= since), interval, complete_head= empty)
+            if not empty:
+                fresh = concat([take(previous, previous["open_time"] < since), fresh])
+            if self.capacity is not None:
+                fresh = take(fresh, slice(-self.capacity, None))
+            self.resampled[interval] = fresh
+        last = merged["open_time"][-1]
+        self.tail = take(merged, merged["open_time"] >= min(bucket_start(last, interval) for interval in self.intervals))
+
+    def arrays(
+            self,
+            interval: str,
+            count: int = None
+        ) -> dict:
+        resampled = self.resampled[interval]
+        if resampled is None:
+            return {}
+        rows = slice(None) if count is None else slice(-count, None)
+        return {column: values[rows].copy() for column, values in resampled.items()}
+
+    def frame(self, interval: str) -> pd.DataFrame:
+        resampled = self.resampled[interval]
+        if resampled is None:
+            return pd.DataFrame()
+        return arrays_frame(resampled)
+
+def resampled_klines(
+        api,
+        symbol: str,
+        intervals: list,
+        start: int,
+        end: int = None,
+        base_interval: str = "1m",
+        workers: int = 8
+    ) -> dict:
+    now = int(time.time() * 1000)
+    aligned = min(bucket_start(int(start), interval) for interval in intervals)
+    candels = api.um_klines_cached(symbol, base_interval, aligned, end, workers= workers)
+    if end is None or int(end) >= bucket_start(now, base_interval):
+        candels = merge_pages([candels, api.um_klines(symbol, base_interval, 2, None, None)])
+        if end is not None:
+            candels = candels.loc[candels["open_time"] <= pd.Timestamp(int(end), unit= "ms", tz= "UTC")]
+    frames = {}
+    for interval in intervals:
+        resampled = resample_klines(candels, interval)
+        first = pd.Timestamp(bucket_start(int(start), interval), unit= "ms", tz= "UTC")
+        frames[interval] = resampled.loc[resampled["open_time"] >= first].reset_index(drop= True)
+    return frames
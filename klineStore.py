@@ -0,0 +1,126 @@
+import os
+import numpy as np
+import pandas as pd
+
+DAY_MS = 86_400_000
+
+KLINE_DTYPE = np.dtype([
+    ("open_time", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+    ("close_time", "i8")
+])
+
+def to_ms(column: pd.Series) -> np.ndarray:
+    return column.dt.as_unit("ms").array.asi8
+
+def merge_ranges(ranges: np.ndarray) -> np.ndarray:
+    if len(ranges) == 0:
+        return ranges.reshape(0, 2)
+    ranges = ranges[np.argsort(ranges[:, 0], kind= "stable")]
+    merged = [list(ranges[0])]
+    for range_start, range_end in ranges[1:]:
+        if range_start <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], range_end)
+        else:
+            merged.append([range_start, range_end])
+    return np.array(merged, dtype= "i8")
+
+class KlineStore:
+    def __init__(self, root: str) -> None:
+        self.root = root
+
+    def _dir(self, symbol: str, interval: str) -> str:
+        return os.path.join(self.root, symbol, interval)
+
+    def _day_path(self, symbol: str, interval: str, day: int) -> str:
+        date = pd.Timestamp(day * DAY_MS, unit= "ms").strftime("%Y-%m-%d")
+        return os.path.join(self._dir(symbol, interval), date + ".npy")
+
+    def _coverage_path(self, symbol: str, interval: str) -> str:
+        return os.path.join(self._dir(symbol, interval), "coverage.npy")
+
+    def _save(self, path: str, array: np.ndarray) -> None:
+        tmp_path = path + ".tmp.npy"
+        np.save(tmp_path, array)
+        os.replace(tmp_path, path)
+
+    def coverage(self, symbol: str, interval: str) -> np.ndarray:
+        path = self._coverage_path(symbol, interval)
+        if not os.path.exists(path):
+            return np.empty((0, 2), dtype= "i8")
+        return np.load(path)
+
+    def gaps(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int
+        ) -> list:
+        missing = []
+        cursor = int(start)
+        for range_start, range_end in self.coverage(symbol, interval):
+            if range_end < cursor:
+                continue
+            if range_start > end:
+                break
+            if range_start > cursor:
+                missing.append((cursor, int(range_start) - 1))
+            cursor = max(cursor, int(range_end) + 1)
+        if cursor <= end:
+            missing.append((cursor, int(end)))
+        return missing
+
+    def write(
+            self,
+            symbol: str,
+            interval: str,
+            candels: pd.DataFrame,
+            covered: tuple = None
+        ) -> None:
+        os.makedirs(self._dir(symbol, interval), exist_ok= True)
+        rows = np.empty(len(candels), dtype= KLINE_DTYPE)
+        rows["open_time"] = to_ms(candels["open_time"])
+        rows["close_time"] = to_ms(candels["close_time"])
+        for field in ("open", "high", "low", "close", "volume"):
+            rows[field] = candels[field].to_numpy(dtype= "f8")
+        days = rows["open_time"] // DAY_MS
+        for day in np.unique(days):
+            path = self._day_path(symbol, interval, int(day))
+            part = rows[days == day]
+            if os.path.exists(path):
+                part = np.concatenate([np.load(path), part])[::-1]
+                _, keep = np.unique(part["open_time"], return_index= True)
+                part = part[keep]
+            self._save(path, part)
+        if covered is not None:
+            ranges = np.vstack([self.coverage(symbol, interval), np.array([covered], dtype= "i8")])
+            self._save(self._coverage_path(symbol, interval), merge_ranges(ranges))
+
+    def read(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int
+        ) -> pd.DataFrame:
+        parts = []
+        for day in range(int(start) // DAY_MS, int(end) // DAY_MS + 1):
+            path = self._day_path(symbol, interval, day)
+            if os.path.exists(path):
+                part = np.load(path, mmap_mode= "r")
+                parts.append(part[(part["open_time"] >= start) & (part["open_time"] <= end)])
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype= KLINE_DTYPE)
+        return pd.DataFrame({
+            "open_time": pd.to_datetime(rows["open_time"], unit= "ms", utc= True),
+            "open": rows["open"],
+            "high": rows["high"],
+            "low": rows["low"],
+            "close": rows["close"],
+            "volume": rows["volume"],
+            "close_time": pd.to_datetime(rows["close_time"], unit= "ms", utc= True)
+        })
@@ -0,0 +1,138 @@
+import bisect
+import threading
+
+LATENCY_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def error_code(error) -> str:
+    code = getattr(error, "code", None)
+    if code is None:
+        return "network" if hasattr(error, "sent") or isinstance(error, OSError) else type(error).__name__
+    return str(code) if code else "http_{}".format(error.status)
+
+class Histogram:
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> list:
+        total, cumulative = 0, []
+        for count in self.counts:
+            total += count
+            cumulative.append(total)
+        return cumulative
+
+    def quantile(self, q: float) -> float:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        for le, total in zip(self.buckets + (float("inf"),), self.cumulative()):
+            if total >= rank:
+                return le
+
+class Metrics:
+    def __init__(
+            self,
+            buckets: tuple = LATENCY_BUCKETS,
+            prefix: str = "tradingapi"
+        ) -> None:
+        self.buckets = buckets
+        self.prefix = prefix
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.latency = {}
+            self.requests = {}
+            self.weight = {}
+            self.retries = {}
+            self.errors = {}
+
+    def observe(
+            self,
+            endpoint: str,
+            phase: str,
+            seconds: float
+        ) -> None:
+        with self._lock:
+            histogram = self.latency.get((endpoint, phase))
+            if histogram is None:
+                histogram = self.latency[(endpoint, phase)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def request(
+            self,
+            endpoint: str,
+            method: str,
+            weight: int
+        ) -> None:
+        with self._lock:
+            self.requests[(endpoint, method)] = self.requests.get((endpoint, method), 0) + 1
+            self.weight[endpoint] = self.weight.get(endpoint, 0) + weight
+
+    def retry(self, endpoint: str) -> None:
+        with self._lock:
+            self.retries[endpoint] = self.retries.get(endpoint, 0) + 1
+
+    def error(
+            self,
+            endpoint: str,
+            error
+        ) -> None:
+        key = (endpoint, error_code(error))
+        with self._lock:
+            self.errors[key] = self.errors.get(key, 0) + 1
+
+    def snapshot(self) -> dict:
+        endpoints = {}
+        def entry(endpoint: str) -> dict:
+            return endpoints.setdefault(endpoint, {"requests": 0, "weight": 0, "retries": 0, "errors": {}, "latency": {}})
+        with self._lock:
+            for (endpoint, method), count in self.requests.items():
+                entry(endpoint)["requests"] += count
+            for endpoint, weight in self.weight.items():
+                entry(endpoint)["weight"] = weight
+            for endpoint, count in self.retries.items():
+                entry(endpoint)["retries"] = count
+            for (endpoint, code), count in self.errors.items():
+                entry(endpoint)["errors"][code] = count
+            for (endpoint, phase), histogram in self.latency.items():
+                entry(endpoint)["latency"][phase] = {
+                    "count": histogram.count,
+                    "sum": histogram.sum,
+                    "mean": histogram.sum / histogram.count,
+                    "p50": histogram.quantile(0.5),
+                    "p99": histogram.quantile(0.99)
+                }
+        return endpoints
+
+    def prometheus(self) -> str:
+        name = self.prefix + "_request_seconds"
+        lines = ["# TYPE {} histogram".format(name)]
+        with self._lock:
+            for (endpoint, phase), histogram in sorted(self.latency.items()):
+                labels = 'endpoint="{}",phase="{}"'.format(endpoint, phase)
+                for le, total in zip(self.buckets + (float("inf"),), histogram.cumulative()):
+                    lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, "+Inf" if le == float("inf") else le, total))
+                lines.append("{}_sum{{{}}} {}".format(name, labels, histogram.sum))
+                lines.append("{}_count{{{}}} {}".format(name, labels, histogram.count))
+            counters = (
+                ("requests_total", self.requests, ("endpoint", "method")),
+                ("request_weight_total", self.weight, ("endpoint",)),
+                ("retries_total", self.retries, ("endpoint",)),
+                ("errors_total", self.errors, ("endpoint", "code"))
+            )
+            for suffix, values, label_names in counters:
+                lines.append("# TYPE {}_{} counter".format(self.prefix, suffix))
+                for key, value in sorted(values.items()):
+                    key = key if isinstance(key, tuple) else (key,)
+                    labels = ",".join('{}="{}"'.format(label, label_value) for label, label_value in zip(label_names, key))
+                    lines.append("{}_{}{{{}}} {}".format(self.prefix, suffix, labels, value))
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,659 @@
+import base64
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import socket
+import socketserver
+import struct
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import requests
+from tradingAPI import INTERVAL_MS, bucket_start, request_weight
+
+MOCK_SYMBOLS = {
+    "BTCUSDT": {"price": 60000.0, "tickSize": "0.10", "stepSize": "0.001", "minQty": "0.001", "notional": "100"},
+    "ETHUSDT": {"price": 3000.0, "tickSize": "0.01", "stepSize": "0.001", "minQty": "0.001", "notional": "20"},
+    "SOLUSDT": {"price": 150.0, "tickSize": "0.0100", "stepSize": "1", "minQty": "1", "notional": "5"}
+}
+
+def fixture_name(method: str, path: str) -> str:
+    return "{}_{}.json".format(method, path.strip("/").replace("/", "_"))
+
+def record_fixtures(
+        directory: str,
+        symbol: str = "BTCUSDT",
+        base_url: str = "https://fapi.binance.com"
+    ) -> list:
+    os.makedirs(directory, exist_ok= True)
+    paths = {
+        "/fapi/v1/exchangeInfo": {},
+        "/fapi/v1/klines": {"symbol": symbol, "interval": "1m", "limit": 1500},
+        "/fapi/v1/markPriceKlines": {"symbol": symbol, "interval": "1m", "limit": 1500},
+        "/fapi/v1/premiumIndex": {}
+    }
+    written = []
+    for path, params in paths.items():
+        response = requests.get(base_url + path, params= params, timeout= 10)
+        response.raise_for_status()
+        file_path = os.path.join(directory, fixture_name("GET", path))
+        with open(file_path, "w") as file:
+            file.write(response.text)
+        written.append(file_path)
+    return written
+
+def synthetic_price(symbol: str, time_ms: int) -> float:
+    base = MOCK_SYMBOLS.get(symbol, {"price": 100.0})["price"]
+    return base * (1 + 0.02 * math.sin(time_ms / 3_600_000) + 0.005 * math.sin(time_ms / 137_000))
+
+class MockState:
+    def __init__(self, symbols: dict) -> None:
+        self.symbols = symbols
+        self.orders = {}
+        self.history = {}
+        self.order_ids = itertools.count(1_000_000)
+        self.lock = threading.Lock()
+
+    def exchange_info(self, params: dict):
+        symbols = []
+        for symbol, spec in self.symbols.items():
+            symbols.append({
+                "symbol": symbol,
+                "status": "TRADING",
+                "contractType": "PERPETUAL",
+                "filters": [
+                    {"filterType": "PRICE_FILTER", "minPrice": spec["tickSize"], "maxPrice": "4529764", "tickSize": spec["tickSize"]},
+                    {"filterType": "LOT_SIZE", "stepSize": spec["stepSize"], "maxQty": "1000", "minQty": spec["minQty"]},
+                    {"filterType": "MARKET_LOT_SIZE", "stepSize": spec["stepSize"], "maxQty": "120", "minQty": spec["minQty"]},
+                    {"filterType": "MIN_NOTIONAL", "notional": spec["notional"]}
+                ]
+            })
+        return 200, {"timezone": "UTC", "serverTime": int(time.time() * 1000), "symbols": symbols}
+
+    def klines(self, params: dict):
+        step = INTERVAL_MS[params["interval"]]
+        limit = int(params.get("limit", 500))
+        if "startTime" in params and "endTime" in params:
+            first = bucket_start(int(params["startTime"]) + step - 1, params["interval"])
+            last = min(int(params["endTime"]), first + (limit - 1) * step)
+        else:
+            last = bucket_start(int(time.time() * 1000), params["interval"])
+            first = last - (limit - 1) * step
+        rows = []
+        for open_time in range(first, last + 1, step):
+            open_price = synthetic_price(params["symbol"], open_time)
+            close_price = synthetic_price(params["symbol"], open_time + step)
+            high, low = max(open_price, close_price) * 1.0005, min(open_price, close_price) * 0.9995
+            volume = 10 + (open_time // step) % 17
+            rows.append([open_time, "%.2f" % open_price, "%.2f" % high, "%.2f" % low, "%.2f" % close_price, "%.3f" % volume,
+                         open_time + step - 1, "%.2f" % (volume * close_price), 100 + (open_time // step) % 50, "%.3f" % (volume / 2), "%.2f" % (volume * close_price / 2), "0"])
+        return 200, rows
+
+    def premium_index(self, params: dict):
+        now = int(time.time() * 1000)
+        def entry(symbol: str) -> dict:
+            price = synthetic_price(symbol, now)
+            return {
+                "symbol": symbol,
+                "markPrice": "%.8f" % price,
+                "indexPrice": "%.8f" % (price * 0.9999),
+                "estimatedSettlePrice": "%.8f" % price,
+                "lastFundingRate": "0.00010000",
+                "interestRate": "0.00010000",
+                "nextFundingTime": (now // 28_800_000 + 1) * 28_800_000,
+                "time": now
+            }
+        if "symbol" in params:
+            return 200, entry(params["symbol"])
+        return 200, [entry(symbol) for symbol in self.symbols]
+
+    def position_risk(self, params: dict):
+        now = int(time.time() * 1000)
+        positions = []
+        for symbol in ([params["symbol"]] if "symbol" in params else self.symbols):
+            price = synthetic_price(symbol, now)
+            for side, amount in (("BOTH", 0.0), ("LONG", 0.01), ("SHORT", -0.01)):
+                positions.append({
+                    "symbol": symbol,
+                    "positionAmt": "%.3f" % amount,
+                    "entryPrice": "%.2f" % (price * 0.99),
+                    "breakEvenPrice": "%.2f" % (price * 0.99),
+                    "markPrice": "%.2f" % price,
+                    "unRealizedProfit": "%.8f" % (amount * price * 0.01),
+                    "liquidationPrice": "0",
+                    "leverage": "10",
+                    "maxNotionalValue": "1000000",
+                    "marginType": "cross",
+                    "isolatedMargin": "0.00000000",
+                    "isAutoAddMargin": "false",
+                    "positionSide": side,
+                    "notional": "%.8f" % (amount * price),
+                    "isolatedWallet": "0",
+                    "updateTime": now
+                })
+        return 200, positions
+
+    def balance(self, params: dict):
+        return 200, [{
+            "accountAlias": "mock",
+            "asset": "USDT",
+            "balance": "10000.00000000",
+            "crossWalletBalance": "10000.00000000",
+            "crossUnPnl": "0.00000000",
+            "availableBalance": "10000.00000000",
+            "maxWithdrawAmount": "10000.00000000",
+            "marginAvailable": True,
+            "updateTime": int(time.time() * 1000)
+        }]
+
+    def account(self, params: dict):
+        _, risk = self.position_risk({})
+        positions = []
+        for row in risk:
+            notional = float(row["notional"])
+            margin = abs(notional) / float(row["leverage"])
+            positions.append({
+                "symbol": row["symbol"],
+                "initialMargin": "%.8f" % margin,
+                "maintMargin": "%.8f" % (abs(notional) * 0.004),
+                "unrealizedProfit": row["unRealizedProfit"],
+                "positionInitialMargin": "%.8f" % margin,
+                "openOrderInitialMargin": "0",
+                "leverage": row["leverage"],
+                "isolated": False,
+                "entryPrice": row["entryPrice"],
+                "breakEvenPrice": row["breakEvenPrice"],
+                "maxNotional": row["maxNotionalValue"],
+                "positionSide": row["positionSide"],
+                "positionAmt": row["positionAmt"],
+                "notional": row["notional"],
+                "isolatedWallet": "0",
+                "updateTime": row["updateTime"]
+            })
+        unrealized = sum(float(row["unrealizedProfit"]) for row in positions)
+        initial = sum(float(row["initialMargin"]) for row in positions)
+        maint = sum(float(row["maintMargin"]) for row in positions)
+        wallet = 10000.0
+        asset = {
+            "asset": "USDT",
+            "walletBalance": "%.8f" % wallet,
+            "unrealizedProfit": "%.8f" % unrealized,
+            "marginBalance": "%.8f" % (wallet + unrealized),
+            "maintMargin": "%.8f" % maint,
+            "initialMargin": "%.8f" % initial,
+            "positionInitialMargin": "%.8f" % initial,
+            "openOrderInitialMargin": "0",
+            "crossWalletBalance": "%.8f" % wallet,
+            "crossUnPnl": "%.8f" % unrealized,
+            "availableBalance": "%.8f" % (wallet + unrealized - initial),
+            "maxWithdrawAmount": "%.8f" % (wallet - initial),
+            "marginAvailable": True,
+            "updateTime": int(time.time() * 1000)
+        }
+        return 200, {
+            "feeTier": 0,
+            "canTrade": True,
+            "canDeposit": True,
+            "canWithdraw": True,
+            "updateTime": 0,
+            "multiAssetsMargin": False,
+            "totalInitialMargin": asset["initialMargin"],
+            "totalMaintMargin": asset["maintMargin"],
+            "totalWalletBalance": asset["walletBalance"],
+            "totalUnrealizedProfit": asset["unrealizedProfit"],
+            "totalMarginBalance": asset["marginBalance"],
+            "totalPositionInitialMargin": asset["positionInitialMargin"],
+            "totalOpenOrderInitialMargin": "0",
+            "totalCrossWalletBalance": asset["crossWalletBalance"],
+            "totalCrossUnPnl": asset["crossUnPnl"],
+            "availableBalance": asset["availableBalance"],
+            "maxWithdrawAmount": asset["maxWithdrawAmount"],
+            "assets": [asset],
+            "positions": positions
+        }
+
+    def listen_key(self, params: dict):
+        return 200, {"listenKey": "mockListenKey"}
+
+    def _new_order(self, params: dict) -> tuple:
+        if params.get("symbol") not in self.symbols:
+            return 400, {"code": -1121, "msg": "Invalid symbol."}
+        with self.lock:
+            order_id = next(self.order_ids)
+            order = {
+                "orderId": order_id,
+                "symbol": params["symbol"],
+                "status": "FILLED" if params.get("type") == "MARKET" else "NEW",
+                "clientOrderId": params.get("newClientOrderId", "mock{}".format(order_id)),
+                "price": str(params.get("price", "0")),
+                "avgPrice": "0.00",
+                "origQty": str(params.get("quantity", "0")),
+                "executedQty": "0",
+                "cumQuote": "0",
+                "timeInForce": params.get("timeInForce", "GTC"),
+                "type": params.get("type"),
+                "reduceOnly": False,
+                "closePosition": False,
+                "side": params.get("side"),
+                "positionSide": params.get("positionSide", "BOTH"),
+                "stopPrice": str(params.get("stopPrice", "0")),
+                "workingType": "CONTRACT_PRICE",
+                "priceProtect": False,
+                "origType": params.get("type"),
+                "updateTime": int(time.time() * 1000)
+            }
+            if order["status"] == "NEW":
+                self.orders[order_id] = order
+            else:
+                order.update({"avgPrice": "%.2f" % synthetic_price(order["symbol"], order["updateTime"]), "executedQty": order["origQty"]})
+            self.history[order_id] = order
+        return 200, dict(order)
+
+    def _find_order(
+            self,
+            params: dict,
+            orders: dict = None
+        ) -> dict:
+        orders = self.orders if orders is None else orders
+        if "orderId" in params:
+            return orders.get(int(params["orderId"]))
+        client_order_id = params.get("origClientOrderId")
+        return next((order for order in reversed(orders.values()) if order["clientOrderId"] == client_order_id), None)
+
+    def _cancel_order(self, params: dict) -> tuple:
+        with self.lock:
+            order = self._find_order(params)
+            if order is None:
+                return 400, {"code": -2011, "msg": "Unknown order sent."}
+            del self.orders[order["orderId"]]
+            order.update(status= "CANCELED", updateTime= int(time.time() * 1000))
+        return 200, dict(order)
+
+    def order(self, params: dict, method: str):
+        if method == "POST":
+            return self._new_order(params)
+        if method == "DELETE":
+            return self._cancel_order(params)
+        if method == "GET":
+            with self.lock:
+                order = self._find_order(params, self.history)
+                if order is None:
+                    return 400, {"code": -2013, "msg": "Order does not exist."}
+                return 200, dict(order)
+        with self.lock:
+            order = self._find_order(params)
+            if order is None:
+                return 400, {"code": -2013, "msg": "Order does not exist."}
+            order.update({"origQty": str(params.get("quantity", order["origQty"])), "price": str(params.get("price", order["price"])), "updateTime": int(time.time() * 1000)})
+            return 200, dict(order)
+
+    def batch_orders(self, params: dict, method: str):
+        results = []
+        if method == "POST":
+            for order in json.loads(params["batchOrders"]):
+                status, result = self._new_order(order)
+                results.append(result)
+            return 200, results
+        if "orderIdList" in params:
+            keys = [{"orderId": order_id} for order_id in json.loads(params["orderIdList"])]
+        else:
+            keys = [{"origClientOrderId": client_order_id} for client_order_id in json.loads(params["origClientOrderIdList"])]
+        for key in keys:
+            status, result = self._cancel_order(key)
+            results.append(result)
+        return 200, results
+
+    def open_orders(self, params: dict):
+        with self.lock:
+            return 200, [dict(order) for order in self.orders.values() if "symbol" not in params or order["symbol"] == params["symbol"]]
+
+    def cancel_all(self, params: dict):
+        with self.lock:
+            for order_id in [order_id for order_id, order in self.orders.items() if order["symbol"] == params.get("symbol")]:
+                self.orders.pop(order_id).update(status= "CANCELED", updateTime= int(time.time() * 1000))
+        return 200, {"code": 200, "msg": "The operation of cancel all open order is done."}
+
+    def position_margin(self, params: dict):
+        return 200, {"amount": float(params.get("amount", 0)), "code": 200, "msg": "Successfully modify position margin.", "type": int(params.get("type", 1))}
+
+class MockServer:
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0,
+            latency: float = 0.0,
+            jitter: float = 0.0,
+            fixtures: str = None,
+            symbols: dict = None,
+            weight_limit: int = 2400,
+            clock_offset: int = 0,
+            seed: int = 0
+        ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.fixtures = {}
+        self.state = MockState(MOCK_SYMBOLS if symbols is None else symbols)
+        self.weight_limit = weight_limit
+        self.clock_offset = clock_offset
+        self.requests = {}
+        self._faults = []
+        self._weight = [0, 0]
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.routes = {
+            ("GET", "/fapi/v1/ping"): lambda params: (200, {}),
+            ("GET", "/fapi/v1/time"): lambda params: (200, {"serverTime": self.server_time()}),
+            ("GET", "/fapi/v1/exchangeInfo"): self.state.exchange_info,
+            ("GET", "/fapi/v1/klines"): self.state.klines,
+            ("GET", "/fapi/v1/markPriceKlines"): self.state.klines,
+            ("GET", "/fapi/v1/premiumIndex"): self.state.premium_index,
+            ("GET", "/fapi/v2/positionRisk"): self.state.position_risk,
+            ("GET", "/fapi/v2/balance"): self.state.balance,
+            ("GET", "/fapi/v2/account"): self.state.account,
+            ("POST", "/fapi/v1/listenKey"): self.state.listen_key,
+            ("PUT", "/fapi/v1/listenKey"): lambda params: (200, {}),
+            ("DELETE", "/fapi/v1/listenKey"): lambda params: (200, {}),
+            ("POST", "/fapi/v1/order"): lambda params: self.state.order(params, "POST"),
+            ("GET", "/fapi/v1/order"): lambda params: self.state.order(params, "GET"),
+            ("PUT", "/fapi/v1/order"): lambda params: self.state.order(params, "PUT"),
+            ("DELETE", "/fapi/v1/order"): lambda params: self.state.order(params, "DELETE"),
+            ("POST", "/fapi/v1/batchOrders"): lambda params: self.state.batch_orders(params, "POST"),
+            ("DELETE", "/fapi/v1/batchOrders"): lambda params: self.state.batch_orders(params, "DELETE"),
+            ("GET", "/fapi/v1/openOrders"): self.state.open_orders,
+            ("DELETE", "/fapi/v1/allOpenOrders"): self.state.cancel_all,
+            ("POST", "/fapi/v1/positionMargin"): self.state.position_margin
+        }
+        if fixtures is not None:
+            self.load_fixtures(fixtures)
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return "http://{}:{}".format(host, port)
+
+    def server_time(self) -> int:
+        return int(time.time() * 1000) + self.clock_offset
+
+    def load_fixtures(self, directory: str) -> None:
+        for method, path in self.routes:
+            file_path = os.path.join(directory, fixture_name(method, path))
+            if os.path.exists(file_path):
+                with open(file_path) as file:
+                    self.fixtures[(method, path)] = json.load(file)
+
+    def inject(
+            self,
+            path: str = None,
+            status: int = 429,
+            code: int = -1003,
+            msg: str = "Too many requests; please use the websocket for live updates.",
+            count: int = 1,
+            probability: float = 1.0,
+            retry_after: int = None
+        ) -> None:
+        with self._lock:
+            self._faults.append({"path": path, "status": status, "payload": {"code": code, "msg": msg}, "count": count, "probability": probability, "retry_after": retry_after})
+
+    def clear_faults(self) -> None:
+        with self._lock:
+            self._faults = []
+
+    def _fault(self, path: str) -> dict:
+        with self._lock:
+            for fault in self._faults:
+                if fault["count"] > 0 and fault["path"] in (None, path) and self._random.random() < fault["probability"]:
+                    fault["count"] -= 1
+                    return fault
+        return None
+
+    def _used_weight(self, method: str, path: str, params: dict) -> int:
+        weight, orders = request_weight(method, path, params)
+        minute = int(time.time() // 60)
+        with self._lock:
+            if self._weight[0] != minute:
+                self._weight = [minute, 0]
+            self._weight[1] += weight
+            self.requests[(method, path)] = self.requests.get((method, path), 0) + 1
+            return self._weight[1]
+
+    def respond(
+            self,
+            method: str,
+            path: str,
+            params: dict
+        ) -> tuple:
+        used_weight = self._used_weight(method, path, params)
+        headers = {"X-MBX-USED-WEIGHT-1M": str(used_weight)}
+        if self.latency or self.jitter:
+            time.sleep(self.latency + self._random.uniform(0, self.jitter))
+        fault = self._fault(path)
+        if fault is not None:
+            if fault["retry_after"] is not None:
+                headers["Retry-After"] = str(fault["retry_after"])
+            return fault["status"], fault["payload"], headers
+        if used_weight > self.weight_limit:
+            headers["Retry-After"] = str(60 - int(time.time()) % 60)
+            return 429, {"code": -1003, "msg": "Too many requests; current limit is {} per minute.".format(self.weight_limit)}, headers
+        if "timestamp" in params:
+            server_time = self.server_time()
+            timestamp = int(params["timestamp"])
+            if timestamp > server_time + 1000 or server_time - timestamp > int(params.get("recvWindow", 5000)):
+                return 400, {"code": -1021, "msg": "Timestamp for this request is outside of the recvWindow."}, headers
+        if (method, path) in self.fixtures:
+            return 200, self.fixtures[(method, path)], headers
+        route = self.routes.get((method, path))
+        if route is None:
+            return 404, {"code": -1000, "msg": "Unknown path {} {}".format(method, path)}, headers
+        status, payload = route(params)
+        return status, payload, headers
+
+    def _handler(self):
+        mock = self
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def _serve(self) -> None:
+                url = urllib.parse.urlsplit(self.path)
+                params = dict(urllib.parse.parse_qsl(url.query))
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    params.update(urllib.parse.parse_qsl(self.rfile.read(length).decode()))
+                status, payload, headers = mock.respond(self.command, url.path, params)
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json;charset=UTF-8")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            do_GET = do_POST = do_PUT = do_DELETE = _serve
+
+            def log_message(self, format, *args) -> None:
+                pass
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target= self.server.serve_forever, daemon= True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+WEBSOCKET_GUID = "258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+
+def websocket_frame(
+        payload: bytes,
+        opcode: int = 1
+    ) -> bytes:
+    if len(payload) < 126:
+        header = struct.pack("!BB", 0x80 | opcode, len(payload))
+    elif len(payload) < 65536:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, len(payload))
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, len(payload))
+    return header + payload
+
+def read_websocket_frame(file) -> tuple:
+    head = file.read(2)
+    if len(head) < 2:
+        return None
+    opcode, length = head[0] & 0x0F, head[1] & 0x7F
+    if length == 126:
+        length = struct.unpack("!H", file.read(2))[0]
+    elif length == 127:
+        length = struct.unpack("!Q", file.read(8))[0]
+    mask = file.read(4) if head[1] & 0x80 else None
+    payload = file.read(length)
+    if mask is not None:
+        payload = bytes(byte ^ mask[i % 4] for i, byte in enumerate(payload))
+    return opcode, payload
+
+class MockStreamConnection:
+    def __init__(
+            self,
+            path: str,
+            sock
+        ) -> None:
+        self.path = path
+        self.sock = sock
+        self._lock = threading.Lock()
+
+    def send(
+            self,
+            payload: bytes,
+            opcode: int = 1
+        ) -> None:
+        with self._lock:
+            self.sock.sendall(websocket_frame(payload, opcode))
+
+    def close(self) -> None:
+        try:
+            self.send(b"", 8)
+        except OSError:
+            pass
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+class MockStreamServer:
+    def __init__(
+            self,
+            host: str = "127.0.0.1",
+            port: int = 0
+        ) -> None:
+        self.connections = []
+        self.paths = []
+        self._changed = threading.Condition()
+        self._thread = None
+        self.server = socketserver.ThreadingTCPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return "ws://{}:{}".format(host, port)
+
+    def _register(self, connection: MockStreamConnection) -> None:
+        with self._changed:
+            self.connections.append(connection)
+            self.paths.append(connection.path)
+            self._changed.notify_all()
+
+    def _unregister(self, connection: MockStreamConnection) -> None:
+        with self._changed:
+            if connection in self.connections:
+                self.connections.remove(connection)
+            self._changed.notify_all()
+
+    def wait_connections(
+            self,
+            count: int,
+            timeout: float = 5.0
+        ) -> bool:
+        with self._changed:
+            return self._changed.wait_for(lambda: len(self.paths) >= count and self.connections, timeout= timeout)
+
+    def send(
+            self,
+            message: dict,
+            path: str = None
+        ) -> int:
+        payload = json.dumps(message).encode()
+        with self._changed:
+            connections = [connection for connection in self.connections if path is None or connection.path.startswith(path)]
+        for connection in connections:
+            connection.send(payload)
+        return len(connections)
+
+    def disconnect(self) -> None:
+        with self._changed:
+            connections = list(self.connections)
+        for connection in connections:
+            connection.close()
+
+    def _handler(self):
+        mock = self
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                request_line = self.rfile.readline().decode()
+                headers = {}
+                for line in iter(self.rfile.readline, b""):
+                    if line in (b"\r\n", b"\n"):
+                        break
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                accept = base64.b64encode(hashlib.sha1((headers.get("sec-websocket-key", "") + WEBSOCKET_GUID).encode()).digest()).decode()
+                self.request.sendall("HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: {}\r\n\r\n".format(accept).encode())
+                connection = MockStreamConnection(request_line.split()[1], self.request)
+                mock._register(connection)
+                try:
+                    while True:
+                        frame = read_websocket_frame(self.rfile)
+                        if frame is None or frame[0] == 8:
+                            break
+                        if frame[0] == 9:
+                            connection.send(frame[1], 10)
+                except OSError:
+                    pass
+                finally:
+                    mock._unregister(connection)
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target= self.server.serve_forever, daemon= True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.disconnect()
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
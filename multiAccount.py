@@ -0,0 +1,145 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from metrics import Metrics
+from tradingAPI import TRADING_API, EndpointRouter, RateLimiter, RetryPolicy, RequestCache, pooled_session
+
+class MultiAccountAPI:
+    def __init__(
+            self,
+            accounts: dict,
+            log_path,
+            pool_size: int = 64,
+            workers: int = 16,
+            timeout: tuple = (3.05, 10),
+            limiter: RateLimiter = None,
+            order_limit_10s: int = 300,
+            order_limit_1m: int = 1200,
+            retry: RetryPolicy = None,
+            metrics: Metrics = None,
+            cache: RequestCache = None,
+            base_url: str = "https://fapi.binance.com",
+            router: EndpointRouter = None
+        ) -> None:
+        self.session = pooled_session(pool_size)
+        self.limiter = RateLimiter(order_limit_10s= None, order_limit_1m= None) if limiter is None else limiter
+        self.cache = RequestCache(max_entries= 0) if cache is None else cache
+        self.metrics = metrics
+        self.accounts = {}
+        for name, (key, secret) in accounts.items():
+            self.accounts[name] = TRADING_API(
+                key,
+                secret,
+                log_path,
+                timeout= timeout,
+                limiter= RateLimiter(weight_limit= None, order_limit_10s= order_limit_10s, order_limit_1m= order_limit_1m, parent= self.limiter),
+                retry= retry,
+                metrics= metrics,
+                base_url= base_url,
+                router= router,
+                cache= self.cache,
+                session= self.session
+            )
+        self.executor = ThreadPoolExecutor(max_workers= workers)
+
+    def close(self) -> None:
+        self.executor.shutdown()
+        for api in self.accounts.values():
+            api.close()
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def __getitem__(self, name: str) -> TRADING_API:
+        return self.accounts[name]
+
+    def _primary(self) -> TRADING_API:
+        return next(iter(self.accounts.values()))
+
+    def _share_state(self) -> None:
+        primary = self._primary()
+        if primary.signer.needs_sync():
+            primary.um_sync_time()
+        if primary._info_expired():
+            primary.um_refresh_info()
+        for api in self.accounts.values():
+            if api is not primary:
+                api.signer.offset, api.signer.rtt, api.signer.synced_at = primary.signer.offset, primary.signer.rtt, primary.signer.synced_at
+                api._symbols, api._filters, api._info_time = primary._symbols, primary._filters, primary._info_time
+
+    def _invoke(
+            self,
+            name: str,
+            operation,
+            args: tuple,
+            kwargs: dict
+        ) -> dict:
+        api = self.accounts[name]
+        call = getattr(api, operation) if isinstance(operation, str) else lambda *args, **kwargs: operation(api, *args, **kwargs)
+        started = time.perf_counter()
+        try:
+            result, error = call(*args, **kwargs), None
+        except Exception as exception:
+            result, error = None, exception
+            logging.debug("MultiAccountAPI: account: {}, operation: {}, error: {}".format(name, operation, exception))
+        return {"account": name, "result": result, "error": error, "seconds": time.perf_counter() - started}
+
+    def run(
+            self,
+            operation,
+            *args,
+            accounts: list = None,
+            per_account: dict = None,
+            **kwargs
+        ) -> pd.DataFrame:
+        self._share_state()
+        names = list(self.accounts) if accounts is None else list(accounts)
+        per_account = {} if per_account is None else per_account
+        started = time.perf_counter()
+        futures = [self.executor.submit(self._invoke, name, operation, args, dict(kwargs, **per_account.get(name, {}))) for name in names]
+        results = pd.DataFrame([future.result() for future in futures], columns= ["account", "result", "error", "seconds"]).set_index("account")
+        results.attrs["seconds"] = time.perf_counter() - started
+        return results
+
+    def frames(self, results: pd.DataFrame) -> pd.DataFrame:
+        frames = {name: result if isinstance(result, pd.DataFrame) else pd.DataFrame(result) for name, result in results["result"].items() if isinstance(result, (pd.DataFrame, list))}
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, names= ["account", *next(iter(frames.values())).index.names])
+
+    def market_order(
+            self,
+            symbol: str,
+            side: str,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            accounts: list = None,
+            per_account: dict = None
+        ) -> pd.DataFrame:
+        return self.run("um_market_order", symbol= symbol, side= side, qty= qty, position= position, client_order_id= client_order_id, accounts= accounts, per_account= per_account)
+
+    def cancel_all(
+            self,
+            symbol: str,
+            accounts: list = None
+        ) -> pd.DataFrame:
+        return self.run("um_cancel_all", symbol, accounts= accounts)
+
+    def positions(
+            self,
+            symbol: str,
+            accounts: list = None
+        ) -> pd.DataFrame:
+        return self.frames(self.run("um_position", symbol, accounts= accounts))
+
+    def balances(self, accounts: list = None) -> pd.DataFrame:
+        return self.frames(self.run("um_balance", accounts= accounts))
+
+    def portfolios(self, accounts: list = None) -> pd.DataFrame:
+        return self.frames(self.run("um_portfolio", accounts= accounts))
@@ -0,0 +1,156 @@
+import logging
+import queue
+import threading
+import zlib
+from concurrent.futures import Future
+
+class OrderQueue:
+    def __init__(
+            self,
+            api,
+            workers: int = 4,
+            max_pending: int = 1000,
+            timeout: float = None
+        ) -> None:
+        self.api = api
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self.pending = 0
+        self._futures = set()
+        self._slots = threading.Semaphore(max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._shards = [queue.SimpleQueue() for _ in range(workers)]
+        self._threads = [threading.Thread(target= self._run, args= (shard,), daemon= True) for shard in self._shards]
+        for thread in self._threads:
+            thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _shard(self, symbol: str) -> queue.SimpleQueue:
+        return self._shards[zlib.crc32(symbol.encode()) % len(self._shards)]
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self.pending -= 1
+            self._futures.discard(future)
+        self._slots.release()
+
+    def _run(self, shard: queue.SimpleQueue) -> None:
+        while True:
+            item = shard.get()
+            if item is None:
+                return
+            future, call, args, kwargs = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(call(*args, **kwargs))
+            except Exception as error:
+                logging.debug("OrderQueue: {} failed: {}".format(getattr(call, "__name__", call), error))
+                future.set_exception(error)
+
+    def submit(
+            self,
+            symbol: str,
+            operation,
+            *args,
+            **kwargs
+        ) -> Future:
+        if self._closed:
+            raise RuntimeError("OrderQueue is closed")
+        if not self._slots.acquire(timeout= self.timeout):
+            raise queue.Full("{} orders pending".format(self.max_pending))
+        call = getattr(self.api, operation) if isinstance(operation, str) else operation
+        future = Future()
+        with self._lock:
+            self.pending += 1
+            self._futures.add(future)
+        future.add_done_callback(self._done)
+        # one shard per symbol keeps submissions for a symbol in order
+        self._shard(symbol).put((future, call, args, kwargs))
+        return future
+
+    def market_order(
+            self,
+            symbol: str,
+            side: str,
+            qty: float,
+            position: str,
+            client_order_id: str
+        ) -> Future:
+        return self.submit(symbol, "um_market_order", symbol, side, qty, position, client_order_id)
+
+    def limit_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str
+        ) -> Future:
+        return self.submit(symbol, "um_limit_order", symbol, side, price, qty, position, client_order_id)
+
+    def stop_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str
+        ) -> Future:
+        return self.submit(symbol, "um_stop_order", symbol, side, price, qty, position, client_order_id)
+
+    def take_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str
+        ) -> Future:
+        return self.submit(symbol, "um_take_order", symbol, side, price, qty, position, client_order_id)
+
+    def modify_order(
+            self,
+            client_order_id: str,
+            symbol: str,
+            side: str,
+            qty: float,
+            price: float
+        ) -> Future:
+        return self.submit(symbol, "um_modify_order", client_order_id, symbol, side, qty, price)
+
+    def cancel_order(
+            self,
+            symbol: str,
+            order_id: int
+        ) -> Future:
+        return self.submit(symbol, "um_cancel_order", symbol, order_id)
+
+    def cancel_all(self, symbol: str) -> Future:
+        return self.submit(symbol, "um_cancel_all", symbol)
+
+    def close(
+            self,
+            wait: bool = True,
+            cancel: bool = False
+        ) -> None:
+        self._closed = True
+        if cancel:
+            with self._lock:
+                futures = list(self._futures)
+            for future in futures:
+                future.cancel()
+        for shard in self._shards:
+            shard.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
@@ -0,0 +1,489 @@
+import heapq
+import itertools
+import logging
+import numpy as np
+import pandas as pd
+from klineResampler import bucket_start, frame_arrays, resample_arrays, take
+from tradingAPI import INTERVAL_MS, ClientError, OrderIndex, arrays_frame, order_ack, position_frame
+
+FUNDING_INTERVAL_MS = 28_800_000
+
+TRIGGER_WINDOW = 256
+
+TRIGGER_CHUNK = 65_536
+
+KLINE_COLUMNS = ("open_time", "open", "high", "low", "close", "volume", "close_time")
+
+# order types that fill when the price trades down to their level; the rest fill on the way up
+FILLS_BELOW = {("LIMIT", "BUY"), ("STOP_MARKET", "SELL"), ("TAKE_PROFIT_MARKET", "BUY")}
+
+class PAPER_TRADING_API:
+    def __init__(
+            self,
+            candels: dict,
+            balance: float = 10000.0,
+            base_interval: str = "1m",
+            start: int = None,
+            maker_fee: float = 0.0002,
+            taker_fee: float = 0.0004,
+            slippage: float = 0.0,
+            funding_rate = 0.0001,
+            filters: dict = None,
+            leverage: int = 10
+        ) -> None:
+        self.base_interval = base_interval
+        self.step = INTERVAL_MS[base_interval]
+        self.candels = {}
+        for symbol, data in candels.items():
+            arrays = frame_arrays(data)
+            self.candels[symbol] = take(arrays, np.argsort(arrays["open_time"], kind= "stable"))
+        self.symbols = list(self.candels)
+        self.start = min(int(arrays["open_time"][0]) for arrays in self.candels.values()) if start is None else int(start)
+        self.end = max(int(arrays["open_time"][-1]) for arrays in self.candels.values()) + self.step
+        self.now = self.start
+        self.balance = float(balance)
+        self.maker_fee = maker_fee
+        self.taker_fee = taker_fee
+        self.slippage = slippage
+        self.funding_rate = funding_rate
+        self.filters = {} if filters is None else filters
+        self.leverage = leverage
+        self.positions = {(symbol, side): [0.0, 0.0] for symbol in self.symbols for side in ("LONG", "SHORT")}
+        self.open = {symbol: {} for symbol in self.symbols}
+        self.history = {}
+        self._triggers = []
+        self.fills = []
+        self.funding = []
+        self.orders = OrderIndex()
+        self._order_ids = itertools.count(1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def close(self) -> None:
+        pass
+
+    def _index(
+            self,
+            symbol: str,
+            time_ms: int
+        ) -> int:
+        return int(np.searchsorted(self.candels[symbol]["open_time"], time_ms))
+
+    def mark_price(
+            self,
+            symbol: str,
+            time_ms: int = None
+        ) -> float:
+        arrays = self.candels[symbol]
+        closed = self._index(symbol, (self.now if time_ms is None else time_ms) - self.step + 1)
+        if closed == 0:
+            return float(arrays["open"][0])
+        return float(arrays["close"][closed - 1])
+
+    def _funding_rate(self, symbol: str) -> float:
+        if isinstance(self.funding_rate, dict):
+            return float(self.funding_rate.get(symbol, 0.0))
+        return float(self.funding_rate)
+
+    def _round(
+            self,
+            symbol: str,
+            value: float,
+            key: str
+        ) -> float:
+        symbol_filter = self.filters.get(symbol)
+        return float(value) if symbol_filter is None else float(np.round(value, symbol_filter[key]))
+
+    def _fill(
+            self,
+            order: dict,
+            price: float,
+            time_ms: int,
+            fee_rate: float
+        ) -> None:
+        position = self.positions[(order["symbol"], order["positionSide"])]
+        direction = 1.0 if order["positionSide"] == "LONG" else -1.0
+        qty = float(order["origQty"])
+        size = abs(position[0])
+        realized = 0.0
+        if (order["side"] == "BUY") == (order["positionSide"] == "LONG"):
+            position[1] = (position[1] * size + price * qty) / (size + qty)
+            position[0] = direction * (size + qty)
+        else:
+            qty = min(qty, size)
+            realized = (price - position[1]) * qty * direction
+            position[0] = direction * (size - qty)
+            if position[0] == 0:
+                position[1] = 0.0
+        fee = price * qty * fee_rate
+        self.balance += realized - fee
+        order.update({
+            "status": "FILLED" if qty > 0 else "EXPIRED",
+            "executedQty": str(qty),
+            "avgPrice": str(price),
+            "cumQuote": str(price * qty),
+            "updateTime": time_ms
+        })
+        self.history[order["orderId"]] = order
+        self.orders.update(order)
+        if qty > 0:
+            self.fills.append({
+                "time": time_ms,
+                "symbol": order["symbol"],
+                "orderId": order["orderId"],
+                "clientOrderId": order["clientOrderId"],
+                "side": order["side"],
+                "positionSide": order["positionSide"],
+                "type": order["type"],
+                "price": price,
+                "qty": qty,
+                "fee": fee,
+                "realizedPnl": realized
+            })
+
+    def _settle_funding(self, time_ms: int) -> None:
+        for (symbol, side), (amount, _) in self.positions.items():
+            if amount == 0:
+                continue
+            rate = self._funding_rate(symbol)
+            payment = -amount * self.mark_price(symbol, time_ms) * rate
+            self.balance += payment
+            self.funding.append({"time": time_ms, "symbol": symbol, "positionSide": side, "rate": rate, "payment": payment})
+
+    def _new_order(
+            self,
+            symbol: str,
+            side: str,
+            order_type: str,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            price: float = None,
+            stop_price: float = None
+        ) -> dict:
+        if symbol not in self.candels:
+            raise ClientError(400, -1121, "Invalid symbol.")
+        if position not in ("LONG", "SHORT"):
+            raise ClientError(400, -4061, "Order's position side does not match user's setting.")
+        if self._round(symbol, qty, "qty_precision") <= 0:
+            raise ClientError(400, -4003, "Quantity less than or equal to zero.")
+        order_id = next(self._order_ids)
+        order = {
+            "orderId": order_id,
+            "symbol": symbol,
+            "status": "NEW",
+            "clientOrderId": client_order_id,
+            "price": str(0.0 if price is None else self._round(symbol, price, "price_precision")),
+            "avgPrice": "0",
+            "origQty": str(self._round(symbol, qty, "qty_precision")),
+            "executedQty": "0",
+            "cumQuote": "0",
+            "timeInForce": "GTC",
+            "type": order_type,
+            "reduceOnly": False,
+            "closePosition": False,
+            "side": side,
+            "positionSide": position,
+            "stopPrice": str(0.0 if stop_price is None else self._round(symbol, stop_price, "price_precision")),
+            "workingType": "CONTRACT_PRICE",
+            "priceProtect": False,
+            "origType": order_type,
+            "updateTime": self.now
+        }
+        self.orders.submitted({"symbol": symbol, "side": side, "positionSide": position, "type": order_type, "quantity": qty, "newClientOrderId": client_order_id})
+        self.history[order_id] = order
+        if order_type == "MARKET":
+            index = self._index(symbol, self.now)
+            arrays = self.candels[symbol]
+            price = float(arrays["open"][index]) if index < len(arrays["open"]) else self.mark_price(symbol)
+            self._fill(order, price * (1 + self.slippage) if side == "BUY" else price * (1 - self.slippage), self.now, self.taker_fee)
+        else:
+            self.open[symbol][order_id] = order
+            self.orders.update(order)
+            self._schedule(order)
+        return order_ack(order)
+
+    def _first_trigger(
+            self,
+            symbol: str,
+            level: float,
+            below: bool,
+            start: int
+        ) -> int:
+        prices = self.candels[symbol]["low" if below else "high"]
+        size = TRIGGER_WINDOW
+        while start < len(prices):
+            window = prices[start:start + size]
+            crossed = window <= level if below else window >= level
+            hit = int(crossed.argmax())
+            if crossed[hit]:
+                return start + hit
+            start += size
+            size = min(size * 4, TRIGGER_CHUNK)
+        return None
+
+    def _schedule(self, order: dict) -> None:
+        symbol = order["symbol"]
+        arrays = self.candels[symbol]
+        level = float(order["price"] if order["type"] == "LIMIT" else order["stopPrice"])
+        below = (order["type"], order["side"]) in FILLS_BELOW
+        first = self._index(symbol, self.now)
+        index = self._first_trigger(symbol, level, below, first)
+        if index is None:
+            return
+        candle_open = float(arrays["open"][index])
+        gapped = candle_open <= level if below else candle_open >= level
+        price, fee_rate = level, self.maker_fee
+        if order["type"] != "LIMIT":
+            price = candle_open if gapped else price
+            price, fee_rate = price * (1 + self.slippage) if order["side"] == "BUY" else price * (1 - self.slippage), self.taker_fee
+        elif gapped and index == first:
+            # marketable when placed: takes liquidity at the open instead of resting at its limit
+            price, fee_rate = candle_open, self.taker_fee
+        heapq.heappush(self._triggers, (int(arrays["open_time"][index]), order["orderId"], price, fee_rate))
+
+    def advance(
+            self,
+            until: int = None,
+            steps: int = 1
+        ) -> list:
+        until = self.now + steps * self.step if until is None else int(until)
+        filled = []
+        funding_time = -(-self.now // FUNDING_INTERVAL_MS) * FUNDING_INTERVAL_MS
+        triggers = self._triggers
+        while True:
+            next_fill = triggers[0][0] if triggers and triggers[0][0] < until else None
+            if funding_time < until and (next_fill is None or funding_time <= next_fill):
+                self._settle_funding(funding_time)
+                funding_time += FUNDING_INTERVAL_MS
+                continue
+            if next_fill is None:
+                break
+            time_ms, order_id, price, fee_rate = heapq.heappop(triggers)
+            order = self.open[self.history[order_id]["symbol"]].pop(order_id, None)
+            if order is None:
+                continue
+            self._fill(order, price, time_ms, fee_rate)
+            filled.append(order_ack(order))
+        self.now = max(self.now, until)
+        return filled
+
+    def run(
+            self,
+            strategy,
+            end: int = None,
+            every: str = None
+        ) -> pd.DataFrame:
+        step = INTERVAL_MS[every or self.base_interval]
+        end = self.end if end is None else int(end)
+        while self.now < end:
+            strategy(self)
+            self.advance(until= min(self.now + step, end))
+        logging.debug("PaperTrading: replayed to {}, balance: {:.2f}, fills: {}".format(self.now, self.balance, len(self.fills)))
+        return self.fills_frame()
+
+    def fills_frame(self) -> pd.DataFrame:
+        fills = pd.DataFrame(self.fills, columns= ["time", "symbol", "orderId", "clientOrderId", "side", "positionSide", "type", "price", "qty", "fee", "realizedPnl"])
+        fills["time"] = pd.to_datetime(fills["time"].astype("int64"), unit= "ms", utc= True)
+        return fills
+
+    def unrealized(self) -> float:
+        return sum((self.mark_price(symbol) - entry) * amount for (symbol, _), (amount, entry) in self.positions.items() if amount != 0)
+
+    def equity(self) -> float:
+        return self.balance + self.unrealized()
+
+    def um_klines(
+            self,
+            symbol: str,
+            interval: str,
+            limit: int,
+            start: int,
+            end: int,
+            extended: bool = False,
+            raw: bool = False,
+            retry = None
+        ):
+        arrays = self.candels[symbol]
+        step = INTERVAL_MS[interval]
+        # like the live endpoint after a close, only whole buckets that have closed by now are returned
+        last = int(bucket_start(self.now, interval)) - step
+        if end is not None:
+            last = min(last, int(bucket_start(int(end), interval)))
+        first = bucket_start(int(start), interval) if start is not None else last - (limit - 1) * step
+        window = take(arrays, slice(self._index(symbol, first), self._index(symbol, last + step)))
+        if not extended:
+            window = {column: window[column] for column in KLINE_COLUMNS}
+        if interval != self.base_interval:
+            window = resample_arrays(window, interval)
+        if start is not None:
+            window = take(window, window["open_time"] >= int(start))
+        window = take(window, slice(0, limit) if start is not None else slice(-limit, None))
+        return window if raw else arrays_frame(window)
+
+    def um_filters(
+            self,
+            symbol: str,
+            refresh: bool = False
+        ) -> dict:
+        return self.filters[symbol]
+
+    def um_market_order(
+            self,
+            symbol: str,
+            side: str,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry = None
+        ) -> dict:
+        return self._new_order(symbol, side, "MARKET", qty, position, client_order_id)
+
+    def um_limit_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry = None
+        ) -> dict:
+        return self._new_order(symbol, side, "LIMIT", qty, position, client_order_id, price= price)
+
+    def um_stop_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry = None
+        ) -> dict:
+        return self._new_order(symbol, side, "STOP_MARKET", qty, position, client_order_id, stop_price= price)
+
+    def um_take_order(
+            self,
+            symbol: str,
+            side: str,
+            price: float,
+            qty: float,
+            position: str,
+            client_order_id: str,
+            retry = None
+        ) -> dict:
+        return self._new_order(symbol, side, "TAKE_PROFIT_MARKET", qty, position, client_order_id, stop_price= price)
+
+    def um_cancel_order(
+            self,
+            symbol: str,
+            order_id: int,
+            retry = None
+        ) -> dict:
+        order = self.open[symbol].pop(int(order_id), None)
+        if order is None:
+            raise ClientError(400, -2011, "Unknown order sent.")
+        order.update(status= "CANCELED", updateTime= self.now)
+        self.orders.update(order)
+        return order_ack(order)
+
+    def um_cancel_all(
+            self,
+            symbol: str,
+            retry = None
+        ) -> None:
+        for order_id in list(self.open[symbol]):
+            self.um_cancel_order(symbol, order_id)
+        return None
+
+    def um_query_order(
+            self,
+            symbol: str,
+            client_order_id: str = None,
+            order_id: int = None,
+            retry = None
+        ) -> dict:
+        if order_id is None:
+            order_id = next((known for known, order in reversed(self.history.items()) if order["clientOrderId"] == client_order_id), None)
+        order = self.history.get(order_id)
+        if order is None or order["symbol"] != symbol:
+            raise ClientError(400, -2013, "Order does not exist.")
+        return order_ack(order)
+
+    def um_search_order(
+            self,
+            symbol: str,
+            client_order_id: str,
+            retry = None
+        ) -> pd.DataFrame:
+        try:
+            return pd.DataFrame([self.um_query_order(symbol, client_order_id= client_order_id)])
+        except ClientError:
+            return pd.DataFrame()
+
+    def um_open_orders(
+            self,
+            symbol: str = None,
+            retry = None
+        ) -> pd.DataFrame:
+        symbols = self.symbols if symbol is None else [symbol]
+        return pd.DataFrame([dict(order) for name in symbols for order in self.open[name].values()])
+
+    def _position_risk(self, symbol: str) -> list:
+        mark = self.mark_price(symbol)
+        rows = []
+        for side in ("BOTH", "LONG", "SHORT"):
+            amount, entry = self.positions[(symbol, side)] if side != "BOTH" else (0.0, 0.0)
+            rows.append({
+                "symbol": symbol,
+                "positionAmt": str(amount),
+                "entryPrice": str(entry),
+                "breakEvenPrice": str(entry),
+                "markPrice": str(mark),
+                "unRealizedProfit": str((mark - entry) * amount if amount else 0.0),
+                "liquidationPrice": "0",
+                "leverage": str(self.leverage),
+                "maxNotionalValue": "0",
+                "marginType": "cross",
+                "isolatedMargin": "0",
+                "isAutoAddMargin": "false",
+                "positionSide": side,
+                "notional": str(amount * mark),
+                "isolatedWallet": "0",
+                "updateTime": self.now
+            })
+        return rows
+
+    def um_position(
+            self,
+            symbol: str,
+            retry = None
+        ) -> pd.DataFrame:
+        return position_frame(self._position_risk(symbol))
+
+    def um_position_risk(
+            self,
+            symbol: str = None,
+            retry = None
+        ) -> list:
+        symbols = self.symbols if symbol is None else [symbol]
+        return [row for name in symbols for row in self._position_risk(name)]
+
+    def um_balance(self, retry = None) -> list:
+        unrealized = self.unrealized()
+        return [{
+            "accountAlias": "paper",
+            "asset": "USDT",
+            "balance": str(self.balance),
+            "crossWalletBalance": str(self.balance),
+            "crossUnPnl": str(unrealized),
+            "availableBalance": str(self.balance + unrealized),
+            "maxWithdrawAmount": str(self.balance),
+            "marginAvailable": True,
+            "updateTime": self.now
+        }]
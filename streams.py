@@ -0,0 +1,278 @@
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import websocket
+from indicators import IndicatorEngine
+from klineResampler import KlineResampler
+from metrics import Metrics
+from tradingAPI import INTERVAL_MS
+
+KLINE_VALUES = ("open", "high", "low", "close", "volume")
+
+class KlineRingBuffer:
+    def __init__(
+            self,
+            symbols: list,
+            capacity: int
+        ) -> None:
+        self.capacity = capacity
+        self.symbols = list(symbols)
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.times = np.zeros((len(self.symbols), capacity, 2), dtype= "int64")
+        self.values = np.full((len(self.symbols), capacity, len(KLINE_VALUES)), np.nan, dtype= "float64")
+        self.head = np.zeros(len(self.symbols), dtype= "int64")
+        self.count = np.zeros(len(self.symbols), dtype= "int64")
+        self._lock = threading.Lock()
+
+    def last_open_time(self, symbol: str) -> int:
+        i = self.index[symbol]
+        if self.count[i] == 0:
+            return None
+        return int(self.times[i, (self.head[i] - 1) % self.capacity, 0])
+
+    def update(
+            self,
+            symbol: str,
+            open_time: int,
+            close_time: int,
+            values
+        ) -> bool:
+        i = self.index[symbol]
+        with self._lock:
+            last = (self.head[i] - 1) % self.capacity
+            if self.count[i] and self.times[i, last, 0] == open_time:
+                self.values[i, last] = values
+                return False
+            if self.count[i] and self.times[i, last, 0] > open_time:
+                return False
+            position = self.head[i]
+            self.times[i, position] = (open_time, close_time)
+            self.values[i, position] = values
+            self.head[i] = (position + 1) % self.capacity
+            self.count[i] = min(self.count[i] + 1, self.capacity)
+            return True
+
+    def extend(
+            self,
+            symbol: str,
+            times: np.ndarray,
+            values: np.ndarray
+        ) -> None:
+        for row_times, row_values in zip(times, values):
+            self.update(symbol, int(row_times[0]), int(row_times[1]), row_values)
+
+    def arrays(self, symbol: str) -> tuple:
+        i = self.index[symbol]
+        with self._lock:
+            count, head = int(self.count[i]), int(self.head[i])
+            order = (np.arange(head - count, head)) % self.capacity
+            return self.times[i, order], self.values[i, order]
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        times, values = self.arrays(symbol)
+        candels = pd.DataFrame(values, columns= KLINE_VALUES)
+        candels.insert(0, "open_time", pd.to_datetime(times[:, 0], unit= "ms", utc= True))
+        candels["close_time"] = pd.to_datetime(times[:, 1], unit= "ms", utc= True)
+        return candels
+
+class StreamWorker:
+    path = "/stream"
+
+    def __init__(
+            self,
+            reconnect_delay: float = 1.0,
+            timeout: float = 30.0,
+            metrics: Metrics = None
+        ) -> None:
+        self.reconnect_delay = reconnect_delay
+        self.timeout = timeout
+        self.metrics = metrics
+        self.last_error = None
+        self.connected = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._ws = None
+
+    def url(self) -> str:
+        raise NotImplementedError
+
+    def on_open(self) -> None:
+        pass
+
+    def on_message(self, message: dict) -> None:
+        raise NotImplementedError
+
+    def heartbeat(self) -> None:
+        pass
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target= self._run, daemon= True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._ws is not None:
+            self._ws.close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            url = None
+            try:
+                url = self.url()
+                self._ws = websocket.create_connection(url, timeout= self.timeout)
+                self.on_open()
+                self.connected.set()
+                while not self._stop.is_set():
+                    try:
+                        message = self._ws.recv()
+                    except websocket.WebSocketTimeoutException:
+                        self._ws.ping()
+                        message = None
+                    if message:
+                        self.on_message(json.loads(message))
+                    self.heartbeat()
+            except Exception as error:
+                # any failure in the handlers reconnects instead of ending the thread
+                if not self._stop.is_set():
+                    self.last_error = error
+                    if self.metrics is not None:
+                        self.metrics.error(self.path, error)
+                    logging.debug("StreamDisconnected: url: {}, error: {}".format(url, error))
+            finally:
+                self.connected.clear()
+                if self._ws is not None:
+                    self._ws.close()
+            self._stop.wait(self.reconnect_delay)
+
+class MarketStream(StreamWorker):
+    def __init__(
+            self,
+            api,
+            symbols: list,
+            interval: str = "1m",
+            capacity: int = 1000,
+            mark_price: bool = True,
+            base_url: str = "wss://fstream.binance.com",
+            backfill: bool = True,
+            resample: list = None,
+            indicators: list = None,
+            reconnect_delay: float = 1.0,
+            timeout: float = 30.0,
+            metrics: Metrics = None
+        ) -> None:
+        super().__init__(reconnect_delay= reconnect_delay, timeout= timeout, metrics= metrics)
+        self.api = api
+        self.symbols = list(symbols)
+        self.interval = interval
+        self.base_url = base_url
+        self.backfill = backfill
+        self.mark_price = mark_price
+        self.klines = KlineRingBuffer(self.symbols, capacity)
+        self.marks = np.full((len(self.symbols), 4), np.nan, dtype= "float64")
+        self.mark_times = np.zeros((len(self.symbols), 2), dtype= "int64")
+        self.resamplers = {symbol: KlineResampler(resample, interval, capacity) for symbol in self.symbols} if resample else {}
+        self.indicators = IndicatorEngine(indicators) if indicators else None
+
+    def url(self) -> str:
+        streams = ["{}@kline_{}".format(symbol.lower(), self.interval) for symbol in self.symbols]
+        if self.mark_price:
+            streams += ["{}@markPrice@1s".format(symbol.lower()) for symbol in self.symbols]
+        return "{}/stream?streams={}".format(self.base_url, "/".join(streams))
+
+    def _backfill_symbol(self, symbol: str) -> None:
+        last = self.klines.last_open_time(symbol)
+        limit = min(self.klines.capacity, 1500)
+        now = int(time.time() * 1000)
+        if last is None or (now - last) // INTERVAL_MS[self.interval] >= limit:
+            candels = self.api.um_klines(symbol, self.interval, limit, None, None, raw= True)
+        else:
+            candels = self.api.um_klines(symbol, self.interval, limit, last, now, raw= True)
+        times = np.column_stack([candels["open_time"], candels["close_time"]])
+        self.klines.extend(symbol, times, np.column_stack([candels[value] for value in KLINE_VALUES]))
+        if symbol in self.resamplers:
+            self.resamplers[symbol].update(candels)
+        self._update_indicators(symbol, candels, None)
+
+    def _update_indicators(
+            self,
+            symbol: str,
+            candels,
+            count: int
+        ) -> None:
+        if self.indicators is None:
+            return
+        self.indicators.update(symbol, self.interval, candels)
+        if symbol in self.resamplers:
+            resampler = self.resamplers[symbol]
+            for interval in resampler.intervals:
+                self.indicators.update(symbol, interval, resampler.arrays(interval, count))
+
+    def on_open(self) -> None:
+        if self.backfill and self.api is not None:
+            with ThreadPoolExecutor(max_workers= 8) as executor:
+                list(executor.map(self._backfill_symbol, self.symbols))
+
+    def on_message(self, message: dict) -> None:
+        data = message.get("data", message)
+        event = data.get("e")
+        if data.get("s") not in self.klines.index:
+            return
+        if event == "kline":
+            kline = data["k"]
+            values = (float(kline["o"]), float(kline["h"]), float(kline["l"]), float(kline["c"]), float(kline["v"]))
+            self.klines.update(kline["s"], int(kline["t"]), int(kline["T"]), values)
+            if kline["s"] in self.resamplers or self.indicators is not None:
+                row = {"open_time": np.array([int(kline["t"])])}
+                row.update({name: np.array([value]) for name, value in zip(KLINE_VALUES, values)})
+                row["close_time"] = np.array([int(kline["T"])])
+                if kline["s"] in self.resamplers:
+                    self.resamplers[kline["s"]].update(row)
+                self._update_indicators(kline["s"], row, 2)
+        elif event == "markPriceUpdate":
+            i = self.klines.index[data["s"]]
+            self.marks[i] = (float(data["p"]), float(data["i"]), float(data["P"]), float(data["r"]))
+            self.mark_times[i] = (int(data["T"]), int(data["E"]))
+
+    def frame(self, symbol: str) -> pd.DataFrame:
+        return self.klines.frame(symbol)
+
+    def arrays(self, symbol: str) -> tuple:
+        return self.klines.arrays(symbol)
+
+    def resampled(
+            self,
+            symbol: str,
+            interval: str
+        ) -> pd.DataFrame:
+        return self.resamplers[symbol].frame(interval)
+
+    def indicator_values(
+            self,
+            symbol: str,
+            interval: str = None
+        ) -> dict:
+        return self.indicators.values(symbol, interval or self.interval)
+
+    def indicator_frame(self) -> pd.DataFrame:
+        return self.indicators.frame()
+
+    def mark_frame(self) -> pd.DataFrame:
+        marks = pd.DataFrame(self.marks.copy(), index= pd.Index(self.symbols, name= "symbol"), columns= ["markPrice", "indexPrice", "estimatedSettlePrice", "lastFundingRate"])
+        mark_times = np.where(self.mark_times > 0, self.mark_times, np.nan)
+        marks["nextFundingTime"] = pd.to_datetime(mark_times[:, 0], unit= "ms", utc= True)
+        marks["time"] = pd.to_datetime(mark_times[:, 1], unit= "ms", utc= True)
+        return marks
@@ -0,0 +1,89 @@
+import os
+import time
+from accountState import AccountState
+from metrics import Metrics
+from mockServer import MockServer, MockStreamServer
+from streams import MarketStream
+from tradingAPI import TRADING_API, RetryPolicy
+
+def wait_until(
+        predicate,
+        timeout: float = 5.0
+    ) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+def kline_message(
+        symbol: str,
+        open_time: int,
+        close: float
+    ) -> dict:
+    kline = {"t": open_time, "T": open_time + 59_999, "s": symbol, "o": "1.0", "h": "2.0", "l": "0.5", "c": str(close), "v": "10.0"}
+    return {"stream": "{}@kline_1m".format(symbol.lower()), "data": {"e": "kline", "E": open_time, "s": symbol, "k": kline}}
+
+def test_market_stream_reconnects_after_backfill_failure():
+    metrics = Metrics()
+    with MockServer() as server, MockStreamServer() as stream_server:
+        api = TRADING_API("k", "s", os.devnull, base_url= server.url)
+        server.inject("/fapi/v1/klines", status= 400, code= -1121, msg= "Invalid symbol.", count= 1)
+        with MarketStream(api, ["BTCUSDT"], base_url= stream_server.url, reconnect_delay= 0.05, timeout= 0.2, metrics= metrics) as stream:
+            assert stream.connected.wait(5)
+            assert len(stream_server.paths) == 2
+            assert metrics.snapshot()["/stream"]["errors"] == {"-1121": 1}
+            assert stream.last_error.code == -1121
+            assert len(stream.frame("BTCUSDT")) > 0
+
+def test_market_stream_skips_unknown_symbols():
+    with MockStreamServer() as stream_server:
+        with MarketStream(None, ["BTCUSDT"], base_url= stream_server.url, reconnect_delay= 0.05, timeout= 0.2) as stream:
+            assert stream.connected.wait(5) and stream_server.wait_connections(1)
+            open_time = int(time.time() * 1000) // 60_000 * 60_000
+            stream_server.send({"stream": "xrpusdt@markPrice@1s", "data": {"e": "markPriceUpdate", "s": "XRPUSDT", "p": "1", "i": "1", "P": "1", "r": "0", "T": 0, "E": 0}})
+            stream_server.send(kline_message("XRPUSDT", open_time, 3.0))
+            stream_server.send(kline_message("BTCUSDT", open_time, 3.0))
+            assert wait_until(lambda: len(stream.frame("BTCUSDT")) == 1)
+            assert stream.frame("BTCUSDT")["close"].iloc[-1] == 3.0
+            assert len(stream_server.paths) == 1 and stream.last_error is None
+
+def test_market_stream_reconnects_after_disconnect():
+    with MockStreamServer() as stream_server:
+        with MarketStream(None, ["BTCUSDT"], base_url= stream_server.url, reconnect_delay= 0.05, timeout= 0.2) as stream:
+            assert stream_server.wait_connections(1)
+            stream_server.disconnect()
+            assert stream_server.wait_connections(2)
+            open_time = int(time.time() * 1000) // 60_000 * 60_000
+            assert wait_until(lambda: stream_server.send(kline_message("BTCUSDT", open_time, 4.0)) and len(stream.frame("BTCUSDT")) == 1)
+
+def order_update(
+        client_order_id: str,
+        status: str
+    ) -> dict:
+    order = {"s": "BTCUSDT", "c": client_order_id, "S": "BUY", "o": "LIMIT", "q": "0.010", "p": "50000", "X": status, "i": 42, "z": "0", "T": int(time.time() * 1000), "ps": "LONG"}
+    return {"e": "ORDER_TRADE_UPDATE", "E": order["T"], "T": order["T"], "o": order}
+
+def test_account_state_retries_failed_resync():
+    metrics = Metrics()
+    with MockServer() as server, MockStreamServer() as stream_server:
+        api = TRADING_API("k", "s", os.devnull, base_url= server.url, retry= RetryPolicy(max_attempts= 1))
+        server.inject("/fapi/v1/openOrders", status= 503, code= 0, msg= "Service Unavailable", count= 1)
+        with AccountState(api, base_url= stream_server.url, reconnect_delay= 0.05, timeout= 0.2, metrics= metrics) as state:
+            assert state.connected.wait(5)
+            assert len(stream_server.paths) == 2
+            assert metrics.snapshot()["/ws"]["errors"] == {"http_503": 1}
+            stream_server.send(order_update("tracked", "NEW"))
+            assert wait_until(lambda: state.order(client_order_id= "tracked") is not None)
+
+def test_account_state_renews_listen_key_after_failed_keepalive():
+    with MockServer() as server, MockStreamServer() as stream_server:
+        api = TRADING_API("k", "s", os.devnull, base_url= server.url, retry= RetryPolicy(max_attempts= 1))
+        with AccountState(api, base_url= stream_server.url, keepalive= 0.0, reconnect_delay= 0.05, timeout= 0.2) as state:
+            assert state.connected.wait(5)
+            server.inject("/fapi/v1/listenKey", status= 400, code= -1125, msg= "This listenKey does not exist.", count= 1)
+            assert stream_server.wait_connections(2)
+            assert state.last_error.code == -1125
+            assert wait_until(state.connected.is_set)
+            assert server.requests[("POST", "/fapi/v1/listenKey")] == 2
@@ -1,341 +1,1285 @@
 import pandas as pd
 import numpy as np
-import datetime
 import requests, hashlib, urllib, hmac
+import json
 import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from decimal import Decimal
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from klineStore import KlineStore
+from metrics import Metrics
+
+INTERVAL_MS = {
+    "1m": 60_000, "3m": 180_000, "5m": 300_000, "15m": 900_000, "30m": 1_800_000,
+    "1h": 3_600_000, "2h": 7_200_000, "4h": 14_400_000, "6h": 21_600_000,
+    "8h": 28_800_000, "12h": 43_200_000, "1d": 86_400_000, "3d": 259_200_000,
+    "1w": 604_800_000
+}
+
+WEEK_OFFSET_MS = 4 * 86_400_000
+
+def bucket_start(open_time, interval: str):
+    step = INTERVAL_MS[interval]
+    offset = WEEK_OFFSET_MS if interval == "1w" else 0
+    return (open_time - offset) // step * step + offset
+
+ENDPOINT_WEIGHTS = {
+    "/fapi/v1/ping": 1,
+    "/fapi/v1/time": 1,
+    "/fapi/v1/exchangeInfo": 1,
+    "/fapi/v2/positionRisk": 5,
+    "/fapi/v2/balance": 5,
+    "/fapi/v2/account": 5,
+    "/fapi/v1/positionMargin": 1,
+    "/fapi/v1/order": 1,
+    "/fapi/v1/allOpenOrders": 1,
+    "/fapi/v1/batchOrders": 1
+}
+
+def kline_weight(limit: int) -> int:
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+def precision(step: str) -> int:
+    return max(0, -Decimal(step).normalize().as_tuple().exponent)
+
+def kline_pages(interval: str, start: int, end: int, limit: int) -> list:
+    if end is None:
+        end = int(time.time() * 1000)
+    span = INTERVAL_MS[interval] * limit
+    return [(page_start, min(page_start + span - 1, int(end))) for page_start in range(int(start), int(end) + 1, span)]
+
+def merge_pages(frames: list) -> pd.DataFrame:
+    if not frames:
+        return klines_frame([])
+    non_empty = [frame for frame in frames if not frame.empty]
+    candels = pd.concat(non_empty or frames[:1], ignore_index= True)
+    candels = candels.drop_duplicates(subset= "open_time", keep= "last").sort_values("open_time")
+    return candels.reset_index(drop= True)
+
+def request_weight(method: str, path: str, params: dict = None) -> tuple:
+    params = params or {}
+    if path in ("/fapi/v1/klines", "/fapi/v1/markPriceKlines"):
+        return kline_weight(int(params.get("limit", 500))), 0
+    if path == "/fapi/v1/premiumIndex":
+        return (1 if "symbol" in params else 10), 0
+    if path == "/fapi/v1/openOrders":
+        return (1 if "symbol" in params else 40), 0
+    if path == "/fapi/v1/batchOrders" and method == "POST":
+        # a batch costs 5 on the 10s order limit but 1 on the 1m limit
+        return 5, (5, 1)
+    if path == "/fapi/v1/order" and method in ("POST", "PUT"):
+        return (0 if method == "POST" else 1), 1
+    return ENDPOINT_WEIGHTS.get(path, 1), 0
+
+class RateLimiter:
+    def __init__(
+            self,
+            weight_limit: int = 2400,
+            order_limit_10s: int = 300,
+            order_limit_1m: int = 1200,
+            headroom: float = 0.95,
+            parent = None
+        ) -> None:
+        limits = {"weight": (60, weight_limit), "orders_10s": (10, order_limit_10s), "orders_1m": (60, order_limit_1m)}
+        self.buckets = {name: (span, int(limit * headroom)) for name, (span, limit) in limits.items() if limit is not None}
+        self.parent = parent
+        self.used = {}
+        self.blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(
+            self,
+            weight: int,
+            orders: int = 0,
+            not_before: float = 0.0
+        ) -> float:
+        if self.parent is not None:
+            not_before = max(not_before, time.time() + self.parent.reserve(weight, orders, not_before))
+        orders_10s, orders_1m = orders if isinstance(orders, tuple) else (orders, orders)
+        cost = {"weight": weight, "orders_10s": orders_10s, "orders_1m": orders_1m}
+        with self._lock:
+            now = time.time()
+            at = max(now, self.blocked_until, not_before)
+            moved = True
+            while moved:
+                moved = False
+                for name, (span, cap) in self.buckets.items():
+                    used = self.used.get((name, int(at // span)), 0)
+                    if cost[name] and used and used + cost[name] > cap:
+                        at = (int(at // span) + 1) * span
+                        moved = True
+            for name, (span, cap) in self.buckets.items():
+                if cost[name]:
+                    key = (name, int(at // span))
+                    self.used[key] = self.used.get(key, 0) + cost[name]
+            if len(self.used) > 64:
+                self.used = {key: value for key, value in self.used.items() if (key[1] + 1) * self.buckets[key[0]][0] > now}
+            return at - now
+
+    def acquire(self, weight: int, orders: int = 0) -> None:
+        delay = self.reserve(weight, orders)
+        if delay > 0:
+            logging.debug("RateLimiter: pause: {:.3f}s weight: {} orders: {}".format(delay, weight, orders))
+            time.sleep(delay)
+
+    def update(self, headers, status: int) -> None:
+        if self.parent is not None:
+            self.parent.update(headers, status)
+        with self._lock:
+            now = time.time()
+            for name, header in (("weight", "X-MBX-USED-WEIGHT-1M"), ("orders_10s", "X-MBX-ORDER-COUNT-10S"), ("orders_1m", "X-MBX-ORDER-COUNT-1M")):
+                value = headers.get(header)
+                if value is not None and name in self.buckets:
+                    key = (name, int(now // self.buckets[name][0]))
+                    self.used[key] = max(self.used.get(key, 0), int(value))
+            if status in (418, 429):
+                retry_after = headers.get("Retry-After")
+                pause = float(retry_after) if retry_after else 60 - now % 60
+                self.blocked_until = max(self.blocked_until, now + pause)
+                logging.debug("RateLimiter: status: {} blocked for {:.1f}s".format(status, pause))
+
+class TradingAPIError(Exception):
+    pass
+
+class ClientError(TradingAPIError):
+    def __init__(self, status: int, code: int, msg: str) -> None:
+        super().__init__("status: {}, code: {}, msg: {}".format(status, code, msg))
+        self.status = status
+        self.code = code
+        self.msg = msg
+
+class RateLimitError(ClientError):
+    pass
+
+class ServerError(TradingAPIError):
+    def __init__(self, status: int, code: int, msg: str) -> None:
+        super().__init__("status: {}, code: {}, msg: {}".format(status, code, msg))
+        self.status = status
+        self.code = code
+        self.msg = msg
+
+class NetworkError(TradingAPIError):
+    def __init__(self, msg: str, sent: bool) -> None:
+        super().__init__(msg)
+        self.sent = sent
+
+def may_have_executed(error: Exception) -> bool:
+    if isinstance(error, NetworkError):
+        return error.sent
+    if isinstance(error, ClientError):
+        # -1007 / 408: the exchange timed out waiting on its backend, the order may still exist
+        return error.code == -1007 or error.status == 408
+    return True
+
+def connect_failed(error: Exception) -> bool:
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if not isinstance(error, requests.exceptions.ConnectionError):
+        return False
+    reason = error.args[0] if error.args else None
+    # requests wraps urllib3's MaxRetryError, whose reason is the connect-phase error
+    return isinstance(getattr(reason, "reason", reason), NewConnectionError)
+
+def check_payload(status: int, data):
+    code, msg = 0, ""
+    if isinstance(data, dict):
+        code, msg = int(data.get("code", 0)), data.get("msg", "")
+    if status in (418, 429):
+        raise RateLimitError(status, code, msg)
+    if status >= 500:
+        raise ServerError(status, code, msg)
+    if status >= 400 or code < 0:
+        raise ClientError(status, code, msg)
+    return data
+
+def load_payload(status: int, body: bytes):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        data = {"code": 0, "msg": body[:200].decode(errors= "replace")}
+    return check_payload(status, data)
+
+class RetryPolicy:
+    def __init__(
+            self,
+            max_attempts: int = 5,
+            backoff: float = 0.2,
+            max_backoff: float = 5.0,
+            deadline: float = 30.0,
+            code_delays: dict = None,
+            retry_unsafe: bool = False
+        ) -> None:
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.deadline = deadline
+        self.code_delays = {-1021: 0.0, -1001: None, -1003: None, -1007: None, -1015: None} if code_delays is None else code_delays
+        self.retry_unsafe = retry_unsafe
+
+    def delay(
+            self,
+            error: TradingAPIError,
+            attempt: int,
+            method: str,
+            elapsed: float
+        ) -> float:
+        if attempt >= self.max_attempts:
+            return None
+        if method == "POST" and not self.retry_unsafe and may_have_executed(error):
+            return None
+        if isinstance(error, ClientError):
+            if error.code not in self.code_delays and not isinstance(error, RateLimitError):
+                return None
+            delay = self.code_delays.get(error.code)
+        else:
+            delay = None
+        if delay is None:
+            delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+        if elapsed + delay > self.deadline:
+            return None
+        return delay
+
+class Signer:
+    def __init__(
+            self,
+            secret: str,
+            sync_interval: float = 300.0,
+            recv_window: int = None
+        ) -> None:
+        self._hmac = hmac.new(secret.encode(), digestmod= hashlib.sha256)
+        self.sync_interval = sync_interval
+        self.recv_window = recv_window
+        self.offset = 0
+        self.rtt = None
+        self.synced_at = None
+        self.sync_lock = threading.Lock()
+
+    def timestamp(self) -> int:
+        return int(time.time() * 1000) + self.offset
+
+    def needs_sync(self) -> bool:
+        if self.sync_interval is None:
+            return False
+        return self.synced_at is None or time.monotonic() - self.synced_at > self.sync_interval
+
+    def invalidate(self) -> None:
+        self.synced_at = None
+
+    def update(self, samples: list) -> None:
+        sent, received, server_time = min(samples, key= lambda sample: sample[1] - sample[0])
+        self.rtt = received - sent
+        self.offset = int(round(server_time - (sent + received) * 500))
+        self.synced_at = time.monotonic()
+        logging.debug("Signer: offset: {}ms rtt: {:.1f}ms".format(self.offset, self.rtt * 1000))
+
+    def sign(self, query: str) -> str:
+        query = (query + "&" if query else "") + "timestamp={}".format(self.timestamp())
+        if self.recv_window is not None and "recvWindow=" not in query:
+            query += "&recvWindow={}".format(self.recv_window)
+        mac = self._hmac.copy()
+        mac.update(query.encode())
+        return query + "&signature=" + mac.hexdigest()
+
+def host_failure(error: Exception) -> bool:
+    return isinstance(error, (NetworkError, ServerError))
+
+class EndpointRouter:
+    def __init__(
+            self,
+            urls: list,
+            probe_interval: float = 30.0,
+            probe_path: str = "/fapi/v1/ping",
+            failure_threshold: int = 3,
+            cooldown: float = 30.0,
+            smoothing: float = 0.2,
+            timeout: tuple = (3.05, 5)
+        ) -> None:
+        self.urls = [url.rstrip("/") for url in urls]
+        self.probe_interval = probe_interval
+        self.probe_path = probe_path
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.smoothing = smoothing
+        self.timeout = timeout
+        self.latency = {url: None for url in self.urls}
+        self.failures = {url: 0 for url in self.urls}
+        self.opened_at = {url: None for url in self.urls}
+        self._trials = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._session = None
+        self._users = 0
+        self._users_lock = threading.Lock()
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.detach()
+
+    def attach(self):
+        # clients sharing a router keep one probe thread alive until the last of them closes
+        with self._users_lock:
+            self._users += 1
+            if self._users == 1:
+                self.start()
+        return self
+
+    def detach(self) -> None:
+        with self._users_lock:
+            self._users = max(self._users - 1, 0)
+            if self._users == 0:
+                self.stop()
+
+    def state(self, url: str) -> str:
+        opened_at = self.opened_at[url]
+        if opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - opened_at >= self.cooldown else "open"
+
+    def select(self) -> str:
+        with self._lock:
+            states = {url: self.state(url) for url in self.urls}
+            candidates = [url for url in self.urls if states[url] == "closed" or (states[url] == "half_open" and url not in self._trials)]
+            if not candidates:
+                # every host is tripped: keep sending to the one that tripped first rather than failing outright
+                return min(self.urls, key= lambda url: self.opened_at[url])
+            rank = {url: i for i, url in enumerate(self.urls)}
+            url = min(candidates, key= lambda url: (self.latency[url] is None, self.latency[url] or 0.0, rank[url]))
+            if states[url] == "half_open":
+                self._trials.add(url)
+            return url
+
+    def success(
+            self,
+            url: str,
+            seconds: float
+        ) -> None:
+        with self._lock:
+            latency = self.latency[url]
+            self.latency[url] = seconds if latency is None else latency + self.smoothing * (seconds - latency)
+            if self.opened_at[url] is not None:
+                logging.debug("EndpointRouter: {} recovered".format(url))
+            self.failures[url] = 0
+            self.opened_at[url] = None
+            self._trials.discard(url)
+
+    def failure(
+            self,
+            url: str,
+            error: Exception
+        ) -> None:
+        with self._lock:
+            self.failures[url] += 1
+            self._trials.discard(url)
+            if self.opened_at[url] is not None:
+                self.opened_at[url] = time.monotonic()
+            elif self.failures[url] >= self.failure_threshold:
+                self.opened_at[url] = time.monotonic()
+                logging.debug("EndpointRouter: {} opened after {} failures, last: {}".format(url, self.failures[url], error))
+
+    def probe(self) -> None:
+        if self._session is None:
+            self._session = pooled_session(len(self.urls))
+        for url in self.urls:
+            sent = time.perf_counter()
+            try:
+                response = self._session.get(url + self.probe_path, timeout= self.timeout)
+                response.close()
+                if response.status_code >= 500:
+                    raise ServerError(response.status_code, 0, "probe")
+            except requests.exceptions.RequestException as error:
+                self.failure(url, NetworkError(str(error), sent= not connect_failed(error)))
+            except ServerError as error:
+                self.failure(url, error)
+            else:
+                self.success(url, time.perf_counter() - sent)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.probe()
+            self._stop.wait(self.probe_interval)
+
+    def start(self):
+        if self.probe_interval is not None and self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target= self._run, daemon= True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def stats(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.DataFrame({
+                "state": [self.state(url) for url in self.urls],
+                "latency": [self.latency[url] for url in self.urls],
+                "failures": [self.failures[url] for url in self.urls]
+            }, index= pd.Index(self.urls, name= "url"))
+
+CACHE_TTLS = {
+    "/fapi/v1/klines": "candle",
+    "/fapi/v1/markPriceKlines": "candle",
+    "/fapi/v1/premiumIndex": 1.0
+}
+
+class RequestCache:
+    def __init__(
+            self,
+            max_entries: int = 256,
+            ttls: dict = None,
+            live_ttl: float = 1.0
+        ) -> None:
+        self.max_entries = max_entries
+        self.ttls = dict(CACHE_TTLS) if ttls is None else ttls
+        self.live_ttl = live_ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def expiry(
+            self,
+            path: str,
+            params: dict
+        ) -> float:
+        ttl = self.ttls.get(path)
+        if ttl is None or self.max_entries <= 0:
+            return None
+        now = time.time()
+        if ttl == "candle":
+            interval = params.get("interval")
+            # calendar intervals such as 1M have no fixed length, so they are only cached as live data
+            if interval not in INTERVAL_MS:
+                return None if self.live_ttl is None else now + self.live_ttl
+            open_start = bucket_start(int(now * 1000), interval)
+            # ranges reaching the forming candle change on every trade
+            if "endTime" not in params or int(params["endTime"]) >= open_start:
+                return None if self.live_ttl is None else now + self.live_ttl
+            return (open_start + INTERVAL_MS[interval]) / 1000
+        return now + ttl
+
+    def get(self, key: tuple) -> tuple:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            if entry[0] <= time.time():
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(
+            self,
+            key: tuple,
+            value,
+            expires: float
+        ) -> None:
+        if expires is None:
+            return
+        with self._lock:
+            self._entries[key] = (expires, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last= False)
+                self.evictions += 1
+
+    def join(
+            self,
+            key: tuple,
+            factory
+        ) -> tuple:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            future = self._inflight[key] = factory()
+            self.misses += 1
+            return future, True
+
+    def leave(self, key: tuple) -> None:
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def fetch(
+            self,
+            key: tuple,
+            call,
+            expires: float
+        ):
+        hit, value = self.get(key)
+        if hit:
+            return value
+        future, leader = self.join(key, Future)
+        if not leader:
+            return future.result()
+        try:
+            value = call()
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        else:
+            self.put(key, value, expires)
+            future.set_result(value)
+            return value
+        finally:
+            self.leave(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0
+            }
+
+TERMINAL_STATUSES = ("FILLED", "CANCELED", "EXPIRED", "REJECTED", "EXPIRED_IN_MATCH")
+
+ORDER_PARAMS = {
+    "symbol": "symbol",
+    "side": "side",
+    "positionSide": "positionSide",
+    "type": "type",
+    "quantity": "origQty",
+    "price": "price",
+    "stopPrice": "stopPrice",
+    "timeInForce": "timeInForce"
+}
+
+ORDER_FLOAT_COLUMNS = ("origQty", "executedQty", "cumQuote", "price", "avgPrice", "stopPrice")
+
+def order_ack(data: dict) -> dict:
+    ack = dict(data)
+    ack["orderId"] = int(ack["orderId"])
+    for field in ORDER_FLOAT_COLUMNS:
+        if field in ack:
+            ack[field] = float(ack[field])
+    ack["transactTime"] = int(ack.get("updateTime", 0))
+    return ack
+
+class OrderIndex:
+    def __init__(self, max_closed: int = 10000) -> None:
+        self.max_closed = max_closed
+        self.orders = {}
+        self.order_ids = {}
+        self._closed = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _store(
+            self,
+            client_order_id: str,
+            order: dict
+        ) -> dict:
+        order["localTime"] = int(time.time() * 1000)
+        self.orders[client_order_id] = order
+        if "orderId" in order:
+            self.order_ids[int(order["orderId"])] = client_order_id
+        if order.get("status") in TERMINAL_STATUSES:
+            self._closed[client_order_id] = None
+            self._closed.move_to_end(client_order_id)
+            while len(self._closed) > self.max_closed:
+                closed, _ = self._closed.popitem(last= False)
+                evicted = self.orders.pop(closed, {})
+                if "orderId" in evicted:
+                    self.order_ids.pop(int(evicted["orderId"]), None)
+        return dict(order)
+
+    def submitted(self, params: dict) -> None:
+        client_order_id = params.get("newClientOrderId")
+        if client_order_id is None:
+            return
+        order = {name: str(params[key]) for key, name in ORDER_PARAMS.items() if params.get(key) is not None}
+        order.update(clientOrderId= str(client_order_id), status= "SUBMITTED", submitTime= int(time.time() * 1000))
+        with self._lock:
+            self._store(order["clientOrderId"], order)
+
+    def update(
+            self,
+            order: dict,
+            create: bool = True
+        ) -> dict:
+        with self._lock:
+            client_order_id = order.get("clientOrderId")
+            if client_order_id is None and "orderId" in order:
+                client_order_id = self.order_ids.get(int(order["orderId"]))
+            known = self.orders.get(client_order_id)
+            if known is None:
+                if not create or client_order_id is None:
+                    return None
+                known = {}
+            if known.get("status") in TERMINAL_STATUSES and order.get("status") not in TERMINAL_STATUSES:
+                return dict(known)
+            if int(known.get("updateTime", 0)) > int(order.get("updateTime", 0)):
+                return dict(known)
+            return self._store(client_order_id, dict(known, **order))
+
+    def failed(
+            self,
+            client_order_id: str,
+            error: Exception
+        ) -> dict:
+        if client_order_id is None:
+            return None
+        # an order whose request may have reached the matching engine can still appear; only a refused or unsent request is final
+        status = "UNKNOWN" if may_have_executed(error) else "REJECTED"
+        with self._lock:
+            known = self.orders.get(str(client_order_id), {"clientOrderId": str(client_order_id)})
+            if known.get("status") not in ("SUBMITTED", "UNKNOWN", None):
+                return dict(known)
+            return self._store(str(client_order_id), dict(known, status= status, error= str(error)))
+
+    def record(
+            self,
+            params: dict,
+            result: dict
+        ) -> dict:
+        if "orderId" in result:
+            return self.update(result)
+        return self.failed(params.get("newClientOrderId"), ClientError(200, result.get("code"), result.get("msg")))
+
+    def canceled_all(self, symbol: str) -> None:
+        # allOpenOrders returns no per-order acks; updateTime is kept so a later fill from the user stream still wins
+        with self._lock:
+            for client_order_id, order in list(self.orders.items()):
+                if order.get("symbol") == symbol and order.get("status") not in TERMINAL_STATUSES:
+                    self._store(client_order_id, dict(order, status= "CANCELED"))
+
+    def get(
+            self,
+            client_order_id: str = None,
+            order_id: int = None
+        ) -> dict:
+        with self._lock:
+            if client_order_id is None:
+                client_order_id = self.order_ids.get(int(order_id))
+            order = self.orders.get(client_order_id)
+            return None if order is None else dict(order)
+
+    def frame(
+            self,
+            symbol: str = None,
+            open_only: bool = False
+        ) -> pd.DataFrame:
+        with self._lock:
+            orders = [dict(order) for order in self.orders.values() if (symbol is None or order.get("symbol") == symbol) and not (open_only and order.get("status") in TERMINAL_STATUSES)]
+        frame = pd.DataFrame(orders)
+        if frame.empty:
+            return frame
+        frame = frame.astype({column: "float64" for column in ORDER_FLOAT_COLUMNS if column in frame.columns})
+        for column in ("submitTime", "updateTime", "localTime"):
+            if column in frame.columns:
+                frame[column] = pd.to_datetime(frame[column], unit= "ms", utc= True)
+        return frame.set_index("clientOrderId")
+
+    def clear(self) -> None:
+        with self._lock:
+            self.orders.clear()
+            self.order_ids.clear()
+            self._closed.clear()
+
+def symbol_filters(info: dict) -> dict:
+    by_type = {f["filterType"]: f for f in info.get("filters", [])}
+    price_filter = by_type.get("PRICE_FILTER", {})
+    lot_size = by_type.get("LOT_SIZE", {})
+    market_lot_size = by_type.get("MARKET_LOT_SIZE", lot_size)
+    min_notional = by_type.get("MIN_NOTIONAL", {})
+    tick_size = price_filter.get("tickSize", "1")
+    step_size = lot_size.get("stepSize", "1")
+    return {
+        "tickSize": float(tick_size),
+        "minPrice": float(price_filter.get("minPrice", 0)),
+        "maxPrice": float(price_filter.get("maxPrice", 0)),
+        "stepSize": float(step_size),
+        "minQty": float(lot_size.get("minQty", 0)),
+        "maxQty": float(lot_size.get("maxQty", 0)),
+        "marketStepSize": float(market_lot_size.get("stepSize", step_size)),
+        "marketMinQty": float(market_lot_size.get("minQty", 0)),
+        "marketMaxQty": float(market_lot_size.get("maxQty", 0)),
+        "minNotional": float(min_notional.get("notional", min_notional.get("minNotional", 0))),
+        "price_precision": precision(tick_size),
+        "qty_precision": precision(step_size),
+        "filters": by_type
+    }
+
+def quantize(values, step: float, digits: int) -> np.ndarray:
+    values = np.asarray(values, dtype= "float64")
+    return np.round(np.round(values / step) * step, digits)
+
+def order_payloads(orders: pd.DataFrame, filters: dict) -> list:
+    orders = orders.copy()
+    for column in ("quantity", "price", "stopPrice"):
+        if column in orders.columns:
+            orders[column] = orders[column].astype("float64")
+    for symbol, index in orders.groupby("symbol").groups.items():
+        symbol_filter = filters[symbol]
+        orders.loc[index, "quantity"] = quantize(orders.loc[index, "quantity"], symbol_filter["stepSize"], symbol_filter["qty_precision"])
+        for column in ("price", "stopPrice"):
+            if column in orders.columns:
+                orders.loc[index, column] = quantize(orders.loc[index, column], symbol_filter["tickSize"], symbol_filter["price_precision"])
+    if "timeInForce" not in orders.columns:
+        orders["timeInForce"] = np.where(orders["type"] == "LIMIT", "GTC", None)
+    payloads = []
+    for record in orders.to_dict("records"):
+        payload = {}
+        for key, value in record.items():
+            if value is None or (isinstance(value, float) and np.isnan(value)):
+                continue
+            if isinstance(value, (bool, np.bool_)):
+                payload[key] = "true" if value else "false"
+            elif isinstance(value, float):
+                payload[key] = np.format_float_positional(value, trim= "-")
+            else:
+                payload[key] = str(value)
+        payloads.append(payload)
+    return payloads
+
+def batch_error_rows(
+        chunk: list,
+        error: TradingAPIError
+    ) -> list:
+    row = {"code": getattr(error, "code", 0), "msg": getattr(error, "msg", None) or str(error)}
+    return [dict(row) for _ in chunk]
+
+KLINE_EXTENDED = {
+    "quote_volume": ("float64", 7),
+    "trades": ("int64", 8),
+    "taker_buy_volume": ("float64", 9),
+    "taker_buy_quote_volume": ("float64", 10)
+}
+
+def decode_klines(data: list, extended: bool = False) -> dict:
+    columns = list(zip(*data)) if data else [()] * 12
+    prices = np.array(columns[1:6], dtype= "float64").reshape(5, -1)
+    arrays = {
+        "open_time": np.array(columns[0], dtype= "int64"),
+        "open": prices[0],
+        "high": prices[1],
+        "low": prices[2],
+        "close": prices[3],
+        "volume": prices[4],
+        "close_time": np.array(columns[6], dtype= "int64")
+    }
+    if extended:
+        for name, (dtype, column) in KLINE_EXTENDED.items():
+            arrays[name] = np.array(columns[column], dtype= dtype)
+    return arrays
+
+def arrays_frame(arrays: dict) -> pd.DataFrame:
+    arrays = dict(arrays)
+    arrays["open_time"] = pd.to_datetime(arrays["open_time"], unit= "ms", utc= True)
+    arrays["close_time"] = pd.to_datetime(arrays["close_time"], unit= "ms", utc= True)
+    return pd.DataFrame(arrays, copy= False)
+
+def klines_frame(data: list, extended: bool = False) -> pd.DataFrame:
+    return arrays_frame(decode_klines(data, extended))
+
+FUNDING_FLOAT_COLUMNS = ("markPrice", "indexPrice", "estimatedSettlePrice", "lastFundingRate", "interestRate")
+
+def funding_frame(data: dict) -> pd.DataFrame:
+    funding_rate = pd.DataFrame([data["symbol"], float(data["lastFundingRate"]), float(data["interestRate"]), int(data["nextFundingTime"]), int(data["time"])]).T
+    funding_rate = funding_rate.rename(columns={0: "symbol", 1: "lastFundingRate", 2: "interestRate", 3: "nextFundingTime", 4: "time"})
+    funding_rate["time"], funding_rate["nextFundingTime"] = pd.to_datetime(funding_rate["time"], utc=True, unit="ms"), pd.to_datetime(funding_rate["nextFundingTime"], utc=True, unit="ms")
+    return funding_rate
+
+def funding_table(data: list) -> pd.DataFrame:
+    funding_rates = pd.DataFrame.from_records(data, index= "symbol")
+    funding_rates = funding_rates.astype({column: "float64" for column in FUNDING_FLOAT_COLUMNS if column in funding_rates.columns})
+    funding_rates["nextFundingTime"] = pd.to_datetime(funding_rates["nextFundingTime"].astype("int64"), unit= "ms", utc= True)
+    funding_rates["time"] = pd.to_datetime(funding_rates["time"].astype("int64"), unit= "ms", utc= True)
+    return funding_rates
+
+def position_frame(data: list) -> pd.DataFrame:
+    position = pd.DataFrame(data)
+    position = position.drop(columns=["maxNotionalValue", "isolatedMargin", "isAutoAddMargin", 
+                                    "isolatedWallet", "markPrice", "marginType", "liquidationPrice"])
+    position = position.astype({'entryPrice' : 'float', 'leverage' : 'float', 'unRealizedProfit': 'float', 'positionAmt': 'float' })
+    position = position.loc[position['positionSide']!='BOTH']
+    position['Sum_poss'] = abs(position['positionAmt'] * position['entryPrice'])
+    position['PNL%'] = position['unRealizedProfit']/position['Sum_poss'] *100
+    position["updateTime"] = pd.to_datetime(position['updateTime'], unit= "ms", utc= True)
+    position = position.loc[position.last_valid_index()-1: position.last_valid_index()].reset_index().drop(columns="index")
+    return position
+
+PORTFOLIO_FLOAT_COLUMNS = ("positionAmt", "entryPrice", "breakEvenPrice", "unrealizedProfit", "notional", "leverage", "initialMargin", "maintMargin", "positionInitialMargin", "openOrderInitialMargin", "isolatedWallet", "maxNotional")
+
+BALANCE_FLOAT_COLUMNS = ("walletBalance", "unrealizedProfit", "marginBalance", "maintMargin", "initialMargin", "positionInitialMargin", "openOrderInitialMargin", "crossWalletBalance", "crossUnPnl", "availableBalance", "maxWithdrawAmount")
+
+def percent(numerator, denominator) -> np.ndarray:
+    numerator = np.asarray(numerator, dtype= "float64")
+    denominator = np.broadcast_to(np.asarray(denominator, dtype= "float64"), numerator.shape)
+    return np.divide(numerator * 100, denominator, out= np.full(numerator.shape, np.nan), where= denominator != 0)
+
+def portfolio_frame(
+        data: dict,
+        include_zero: bool = False
+    ) -> pd.DataFrame:
+    positions = pd.DataFrame(data["positions"], columns= ["symbol", "positionSide", *PORTFOLIO_FLOAT_COLUMNS, "isolated", "updateTime"])
+    positions = positions.astype({column: "float64" for column in PORTFOLIO_FLOAT_COLUMNS})
+    if not include_zero:
+        positions = positions.loc[positions["positionAmt"].to_numpy() != 0]
+    account = {key: float(value) for key, value in data.items() if key.startswith("total") or key in ("availableBalance", "maxWithdrawAmount")}
+    margin_balance = account.get("totalMarginBalance", 0.0)
+    amount = positions["positionAmt"].to_numpy()
+    notional = positions["notional"].to_numpy()
+    positions["markPrice"] = np.divide(notional, amount, out= np.full(amount.shape, np.nan), where= amount != 0)
+    positions["Sum_poss"] = np.abs(amount * positions["entryPrice"].to_numpy())
+    positions["PNL%"] = percent(positions["unrealizedProfit"], positions["Sum_poss"])
+    positions["exposure%"] = percent(np.abs(notional), margin_balance)
+    positions["margin%"] = percent(positions["initialMargin"], margin_balance)
+    positions["maint%"] = percent(positions["maintMargin"], margin_balance)
+    positions["updateTime"] = pd.to_datetime(positions["updateTime"].astype("int64"), unit= "ms", utc= True)
+    positions = positions.set_index(["symbol", "positionSide"]).sort_index()
+    balances = pd.DataFrame(data.get("assets", []), columns= ["asset", *BALANCE_FLOAT_COLUMNS, "marginAvailable", "updateTime"])
+    balances = balances.astype({column: "float64" for column in BALANCE_FLOAT_COLUMNS}).set_index("asset")
+    account["exposure"] = float(np.abs(notional).sum())
+    account["netExposure"] = float(notional.sum())
+    account["exposure%"] = float(percent(account["exposure"], margin_balance))
+    account["margin%"] = float(percent(account.get("totalInitialMargin", 0.0), margin_balance))
+    account["maint%"] = float(percent(account.get("totalMaintMargin", 0.0), margin_balance))
+    positions.attrs["balances"] = balances.to_dict("index")
+    positions.attrs["account"] = account
+    return positions
+
+def pooled_session(pool_size: int) -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections= pool_size, pool_maxsize= pool_size, max_retries= 0)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
 
 class TRADING_API:
-    def __init__(self, key, secret, log_path) -> None:
+    def __init__(
+            self,
+            key,
+            secret,
+            log_path,
+            pool_size: int = 10,
+            timeout: tuple = (3.05, 10),
+            headers: dict = None,
+            info_ttl: float = 3600,
+            store = None,
+            limiter: RateLimiter = None,
+            retry: RetryPolicy = None,
+            metrics: Metrics = None,
+            base_url: str = "https://fapi.binance.com",
+            signer: Signer = None,
+            cache: RequestCache = None,
+            session: requests.Session = None,
+            orders: OrderIndex = None,
+            router: EndpointRouter = None
+        ) -> None:
         self.key = key
+        self.router = None if router is None else router.attach()
+        self.base_url = base_url if router is None else router.urls[0]
         self.secret = secret
+        self.signer = Signer(secret) if signer is None else signer
+        self.cache = RequestCache(max_entries= 0) if cache is None else cache
+        self.orders = OrderIndex() if orders is None else orders
+        self.timeout = timeout
+        self.limiter = RateLimiter() if limiter is None else limiter
+        self.retry = RetryPolicy() if retry is None else retry
+        self.metrics = metrics
+        self.info_ttl = info_ttl
+        self._symbols = {}
+        self._filters = {}
+        self._info_time = None
+        self._info_lock = threading.Lock()
+        self.store = KlineStore(store) if isinstance(store, str) else store
+        self.headers = {"X-MBX-APIKEY": key}
+        if headers is not None:
+            self.headers.update(headers)
+        self._owns_session = session is None
+        self.session = pooled_session(pool_size) if session is None else session
         logging.basicConfig(filename= log_path, level= logging.DEBUG)
         pass
 
+    def close(self) -> None:
+        if self._owns_session:
+            self.session.close()
+        if self.router is not None:
+            self.router.detach()
+            self.router = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def _send(
+            self,
+            method: str,
+            endpoint: str,
+            query: str
+        ) -> tuple:
+        try:
+            response = self.session.request(method, url= endpoint, params= query, headers= self.headers, timeout= self.timeout)
+        except requests.exceptions.RequestException as error:
+            raise NetworkError(str(error), sent= not connect_failed(error)) from error
+        self.limiter.update(response.headers, response.status_code)
+        body = response.content
+        response.close()
+        return response.status_code, body
+
+    def _request(
+            self,
+            method: str,
+            endpoint: str,
+            params: dict = None,
+            signed: bool = False,
+            retry: RetryPolicy = None,
+            decode = None
+        ):
+        started = time.monotonic()
+        path = urllib.parse.urlsplit(endpoint).path
+        query = None if params is None else urllib.parse.urlencode(params)
+        call = lambda: self._call(method, endpoint, path, params, query, signed, retry)
+        if method == "GET" and not signed:
+            data = self.cache.fetch((path, query), call, self.cache.expiry(path, params))
+        else:
+            data = call()
+        decoded = time.perf_counter()
+        if decode is not None:
+            data = decode(data)
+        if self.metrics is not None:
+            self.metrics.observe(path, "decode", time.perf_counter() - decoded)
+            self.metrics.observe(path, "total", time.monotonic() - started)
+        return data
+
+    def _call(
+            self,
+            method: str,
+            endpoint: str,
+            path: str,
+            params: dict,
+            query: str,
+            signed: bool,
+            retry: RetryPolicy
+        ):
+        retry = self.retry if retry is None else retry
+        weight, orders = request_weight(method, path, params)
+        if signed and self.signer.needs_sync():
+            self.um_sync_time()
+        metrics = self.metrics
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            attempt += 1
+            self.limiter.acquire(weight, orders)
+            host = None if self.router is None else self.router.select()
+            try:
+                clock = time.perf_counter()
+                signed_query = self.signer.sign(query) if signed else query
+                sent = time.perf_counter()
+                if metrics is not None:
+                    metrics.request(path, method, weight)
+                status, body = self._send(method, endpoint if host is None else host + path, signed_query)
+                received = time.perf_counter()
+                if metrics is not None:
+                    if signed:
+                        metrics.observe(path, "sign", sent - clock)
+                    metrics.observe(path, "network", received - sent)
+                data = load_payload(status, body)
+                if host is not None:
+                    self.router.success(host, received - sent)
+                if metrics is not None:
+                    metrics.observe(path, "parse", time.perf_counter() - received)
+                return data
+            except TradingAPIError as error:
+                if host is not None:
+                    if host_failure(error):
+                        self.router.failure(host, error)
+                    else:
+                        self.router.success(host, time.perf_counter() - sent)
+                elapsed = time.monotonic() - started
+                delay = retry.delay(error, attempt, method, elapsed)
+                if delay is not None:
+                    delay = max(delay, self.limiter.blocked_until - time.time())
+                if metrics is not None:
+                    metrics.error(path, error)
+                if delay is None or elapsed + delay > retry.deadline:
+                    logging.debug("RequestFailed: endpoint: {}, attempt: {}, error: {}".format(endpoint, attempt, error))
+                    raise
+                if metrics is not None:
+                    metrics.retry(path)
+                logging.debug("RetryScheduled: endpoint: {}, attempt: {}, delay: {:.3f}, error: {}".format(endpoint, attempt, delay, error))
+                time.sleep(delay)
+                if getattr(error, "code", None) == -1021:
+                    self.um_sync_time()
+
+    def um_server_time(
+            self,
+            retry: RetryPolicy = None
+        ) -> int:
+        endpoint = self.base_url + "/fapi/v1/time"
+        return self._request("GET", endpoint, retry= retry)["serverTime"]
+
+    def um_sync_time(
+            self,
+            samples: int = 3
+        ) -> int:
+        if not self.signer.sync_lock.acquire(blocking= False):
+            with self.signer.sync_lock:
+                return self.signer.offset
+        try:
+            measured = []
+            for _ in range(samples):
+                sent = time.time()
+                server_time = self.um_server_time()
+                measured.append((sent, time.time(), server_time))
+            self.signer.update(measured)
+        finally:
+            self.signer.sync_lock.release()
+        return self.signer.offset
+
     def um_klines(
             self, 
             symbol: str, 
             interval: str, 
             limit: int, 
             start, 
-            end
+            end,
+            extended: bool = False,
+            raw: bool = False,
+            retry: RetryPolicy = None
         ) -> pd.DataFrame:
-        logging.debug("um_klines: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/klines"
-        api_secret = self.secret
-        api_key = self.key
-        logging.debug("um_klines: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                if start != None and end != None:
-                    params = {  "symbol": symbol, 
-                                "interval": interval, 
-                                "limit": limit,
-                                "startTime": start,
-                                "endTime": end
-                    }
-                else:
-                    params = {  "symbol": symbol, 
-                                "interval": interval, 
-                                "limit": limit
-                    }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_klines: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.get(url= endpoint, params= params, headers= headers)
-                response.json()[0]
-                candels = pd.DataFrame(response.json())
-                response.close()
-                logging.debug("um_klines: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        candels = candels.rename(columns = {0: 'open_time', 1:'open', 2:'high', 3:'low', 4:'close', 5:'volume', 6: 'close_time'})
-        candels = candels.drop([7,8,9,10,11], axis='columns')
-        candels = candels.astype({'open':'float', 'high':'float','low':'float', 'close':'float','volume':'float'})
-        candels["open_time"] = pd.to_datetime(candels['open_time'], unit= "ms", utc= True)
-        candels["close_time"] = pd.to_datetime(candels['close_time'], unit= "ms", utc= True)
-        logging.debug("um_klines: stage: end execution: {}".format(datetime.datetime.now()))
+        endpoint = self.base_url + "/fapi/v1/klines"
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start != None and end != None:
+            params.update({"startTime": start, "endTime": end})
+        decode = decode_klines if raw else klines_frame
+        candels = self._request("GET", endpoint, params, retry= retry, decode= lambda data: decode(data, extended))
         return candels
 
-    def um_mark_klines(self, 
-                       symbol: str, 
-                       interval: str, 
-                       limit: int, 
-                       start, 
-                       end
+    def um_mark_klines(
+            self, 
+            symbol: str, 
+            interval: str, 
+            limit: int, 
+            start, 
+            end,
+            extended: bool = False,
+            raw: bool = False,
+            retry: RetryPolicy = None
         ) -> pd.DataFrame:
-        logging.debug("um_mark_klines: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/markPriceKlines"
-        api_secret = self.secret
-        api_key = self.key
-        logging.debug("um_mark_klines: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                if start != None and end != None:
-                    params = {  "symbol": symbol, 
-                                "interval": interval, 
-                                "limit": limit,
-                                "startTime": start, 
-                                "endTime": end
-                    }
-                else:
-                    params = {  "symbol": symbol, 
-                                "interval": interval, 
-                                "limit": limit
-                    }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_mark_klines: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.get(url= endpoint, params= params, headers= headers)
-                response.json()[0]
-                candels = pd.DataFrame(response.json())
-                response.close()
-                logging.debug("um_mark_klines: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        candels = candels.rename(columns = {0: 'open_time', 1:'open', 2:'high', 3:'low', 4:'close', 5:'volume', 6: 'close_time'})
-        candels = candels.drop([7,8,9,10,11], axis='columns')
-        candels = candels.astype({'open':'float', 'high':'float','low':'float', 'close':'float','volume':'float'})
-        candels["open_time"] = pd.to_datetime(candels['open_time'], unit= "ms", utc= True)
-        candels["close_time"] = pd.to_datetime(candels['close_time'], unit= "ms", utc= True)
-        logging.debug("um_mark_klines: stage: end execution: {}".format(datetime.datetime.now()))
+        endpoint = self.base_url + "/fapi/v1/markPriceKlines"
+        params = {"symbol": symbol, "interval": interval, "limit": limit}
+        if start != None and end != None:
+            params.update({"startTime": start, "endTime": end})
+        decode = decode_klines if raw else klines_frame
+        candels = self._request("GET", endpoint, params, retry= retry, decode= lambda data: decode(data, extended))
         return candels
 
+    def _klines_range(
+            self,
+            fetch,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int,
+            limit: int,
+            workers: int
+        ) -> pd.DataFrame:
+        pages = kline_pages(interval, start, end, limit)
+        with ThreadPoolExecutor(max_workers= workers) as executor:
+            frames = list(executor.map(lambda page: fetch(symbol, interval, limit, page[0], page[1]), pages))
+        return merge_pages(frames)
+
+    def um_klines_range(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int = None,
+            limit: int = 499,
+            workers: int = 8
+        ) -> pd.DataFrame:
+        return self._klines_range(self.um_klines, symbol, interval, start, end, limit, workers)
+
+    def um_mark_klines_range(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int = None,
+            limit: int = 499,
+            workers: int = 8
+        ) -> pd.DataFrame:
+        return self._klines_range(self.um_mark_klines, symbol, interval, start, end, limit, workers)
+
+    def um_klines_cached(
+            self,
+            symbol: str,
+            interval: str,
+            start: int,
+            end: int = None,
+            workers: int = 8
+        ) -> pd.DataFrame:
+        now = int(time.time() * 1000)
+        end = now if end is None else min(int(end), now)
+        # weekly candles open on Monday, so the open candle is found by bucket, not by epoch multiples
+        closed_end = int(bucket_start(now, interval)) - 1
+        if self.store is None:
+            return self.um_klines_range(symbol, interval, start, end, workers= workers)
+        for gap_start, gap_end in self.store.gaps(symbol, interval, start, min(end, closed_end)):
+            candels = self.um_klines_range(symbol, interval, gap_start, gap_end, workers= workers)
+            candels = candels.loc[candels["close_time"] <= pd.Timestamp(closed_end, unit= "ms", tz= "UTC")]
+            self.store.write(symbol, interval, candels, covered= (gap_start, gap_end))
+        return self.store.read(symbol, interval, start, min(end, closed_end))
+
     def um_funding(
             self, 
-            symbol: str
+            symbol: str,
+            retry: RetryPolicy = None
         ) -> pd.DataFrame:
-        logging.debug("um_funding: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/premiumIndex"
-        api_secret = self.secret
-        api_key = self.key
-        logging.debug("um_funding: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_funding: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.get(url= endpoint, params= params, headers= headers)
-                data = response.json()
-                data["symbol"]
-                response.close()
-                logging.debug("um_funding: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        funding_rate = pd.DataFrame([data["symbol"], float(data["lastFundingRate"]), float(data["interestRate"]), int(data["nextFundingTime"]), int(data["time"])]).T
-        funding_rate = funding_rate.rename(columns={0: "symbol", 1: "lastFundingRate", 2: "interestRate", 3: "nextFundingTime", 4: "time"})
-        funding_rate["time"], funding_rate["nextFundingTime"] = pd.to_datetime(funding_rate["time"], utc=True, unit="ms"), pd.to_datetime(funding_rate["nextFundingTime"], utc=True, unit="ms")
-        logging.debug("um_funding: stage: end execution: {}".format(datetime.datetime.now()))
+        endpoint = self.base_url + "/fapi/v1/premiumIndex"
+        funding_rate = self._request("GET", endpoint, {"symbol": symbol}, retry= retry, decode= funding_frame)
         return funding_rate
 
+    def um_funding_all(
+            self,
+            symbols: list = None,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/premiumIndex"
+        funding_rates = self._request("GET", endpoint, {}, retry= retry, decode= funding_table)
+        if symbols is not None:
+            funding_rates = funding_rates.loc[funding_rates.index.isin(symbols)]
+        return funding_rates
+
     def um_position(
             self, 
-            symbol: str
+            symbol: str,
+            retry: RetryPolicy = None
         ) -> pd.DataFrame:
-        logging.debug("um_position: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v2/positionRisk"
-        api_secret = self.secret
-        api_key = self.key
-        error_bool = True
-        logging.debug("um_position: stage: initializate request: {}".format(datetime.datetime.now()))
-        while error_bool:
-            try:
-                utcnow = int(datetime.datetime.now().timestamp() * 1000)
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "recvWindow": 10000,
-                    "timestamp": utcnow
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_position: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.get(endpoint, params= params, headers= headers)
-                response.json()[0]["symbol"]
-                position = pd.DataFrame(response.json())
-                response.close()
-                logging.debug("um_position: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        position = position.drop(columns=["maxNotionalValue", "isolatedMargin", "isAutoAddMargin", 
-                                        "isolatedWallet", "markPrice", "marginType", "liquidationPrice"])
-        position = position.astype({'entryPrice' : 'float', 'leverage' : 'float', 'unRealizedProfit': 'float', 'positionAmt': 'float' })
-        position = position.loc[position['positionSide']!='BOTH']
-        position['Sum_poss'] = abs(position['positionAmt'] * position['entryPrice'])
-        position['PNL%'] = position['unRealizedProfit']/position['Sum_poss'] *100
-        position["updateTime"] = pd.to_datetime(position['updateTime'], unit= "ms", utc= True)
-        position = position.loc[position.last_valid_index()-1: position.last_valid_index()].reset_index().drop(columns="index")
-        logging.debug("um_position: stage: end execution: {}".format(datetime.datetime.now()))
+        endpoint = self.base_url + "/fapi/v2/positionRisk"
+        params = {"symbol": symbol, "recvWindow": 10000}
+        position = self._request("GET", endpoint, params, signed= True, retry= retry, decode= position_frame)
         return position
 
+    def um_position_risk(
+            self,
+            symbol: str = None,
+            retry: RetryPolicy = None
+        ) -> list:
+        endpoint = self.base_url + "/fapi/v2/positionRisk"
+        params = {"recvWindow": 10000} if symbol is None else {"symbol": symbol, "recvWindow": 10000}
+        return self._request("GET", endpoint, params, signed= True, retry= retry)
+
+    def um_balance(
+            self,
+            retry: RetryPolicy = None
+        ) -> list:
+        endpoint = self.base_url + "/fapi/v2/balance"
+        return self._request("GET", endpoint, {}, signed= True, retry= retry)
+
+    def um_portfolio(
+            self,
+            include_zero: bool = False,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v2/account"
+        params = {"recvWindow": 10000}
+        return self._request("GET", endpoint, params, signed= True, retry= retry, decode= lambda data: portfolio_frame(data, include_zero))
+
+    def um_listen_key(
+            self,
+            retry: RetryPolicy = None
+        ) -> str:
+        endpoint = self.base_url + "/fapi/v1/listenKey"
+        return self._request("POST", endpoint, retry= retry)["listenKey"]
+
+    def um_keepalive_listen_key(
+            self,
+            retry: RetryPolicy = None
+        ) -> None:
+        endpoint = self.base_url + "/fapi/v1/listenKey"
+        self._request("PUT", endpoint, retry= retry)
+        return None
+
+    def um_close_listen_key(
+            self,
+            retry: RetryPolicy = None
+        ) -> None:
+        endpoint = self.base_url + "/fapi/v1/listenKey"
+        self._request("DELETE", endpoint, retry= retry)
+        return None
+
+    def um_refresh_info(
+            self,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/exchangeInfo"
+        info = self._request("GET", endpoint, retry= retry)
+        symbols = {i["symbol"]: i for i in info["symbols"]}
+        filters = {name: symbol_filters(i) for name, i in symbols.items()}
+        self._symbols, self._filters = symbols, filters
+        self._info_time = time.monotonic()
+        return self._symbols
+
+    def _info_expired(self) -> bool:
+        return self._info_time is None or time.monotonic() - self._info_time > self.info_ttl
+
     def um_info(
             self, 
-            symbol: str
-        ) -> pd.DataFrame:
-        logging.debug("um_info: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/exchangeInfo"
-        api_key = self.key
-        error_bool = True
-        logging.debug("um_info: stage: initializate request: {}".format(datetime.datetime.now()))
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                logging.debug("um_info: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.get(url= endpoint, headers= headers)
-                symbol_info = {}
-                info = response.json()
-                info["symbols"]
-                logging.debug("um_info: stage: close request: {}".format(datetime.datetime.now()))
-                for i in info["symbols"]:
-                    if i["symbol"] == symbol:
-                        symbol_info = i
-                        break
-                response.close()
-            except KeyError:
-                print(response.json())
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_info: stage: end execution: {}".format(datetime.datetime.now()))
-        return symbol_info
+            symbol: str,
+            refresh: bool = False
+        ) -> dict:
+        if refresh or self._info_expired():
+            with self._info_lock:
+                if refresh or self._info_expired():
+                    self.um_refresh_info()
+        return self._symbols.get(symbol, {})
+
+    def um_filters(
+            self,
+            symbol: str,
+            refresh: bool = False
+        ) -> dict:
+        self.um_info(symbol, refresh= refresh)
+        return self._filters[symbol]
    
     def um_open_orders(
             self, 
-            symbol: str
+            symbol: str = None,
+            retry: RetryPolicy = None
         ) -> pd.DataFrame:
-        logging.debug("um_open_orders: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/openOrders"
-        api_secret = self.secret
-        api_key = self.key
-        logging.debug("um_open_orders: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "timestamp": int(datetime.datetime.now().timestamp() * 1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_open_orders: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.get(url= endpoint, params= params, headers= headers)
-                if response.json() != []:
-                    #print(response.json())
-                    response.json()[0]["orderId"]
-                open_orders = pd.DataFrame(response.json())
-                response.close()
-                logging.debug("um_open_orders: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False    
-        logging.debug("um_open_orders: stage: end execution: {}".format(datetime.datetime.now()))
+        endpoint = self.base_url + "/fapi/v1/openOrders"
+        params = {} if symbol is None else {"symbol": symbol}
+        open_orders = self._request("GET", endpoint, params, signed= True, retry= retry, decode= pd.DataFrame)
         return open_orders
    
     def um_modify_margin(
@@ -343,126 +1287,78 @@ class TRADING_API:
             symbol: str, 
             type: int, 
             amt: float, 
-            position: str
+            position: str,
+            retry: RetryPolicy = None
         ) -> None:
-        logging.debug("um_modify_margin: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/positionMargin"
-        api_secret = self.secret
-        api_key = self.key
-        logging.debug("um_modify_margin: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "type": type,
-                    "amount": amt, 
-                    "positionSide": position,
-                    "timestamp": int(datetime.datetime.now().timestamp() * 1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_modify_margin: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.post(url= endpoint, params= params, headers= headers)
-                if response.json()["msg"] == "Successfully modify position margin.":
-                    error_bool = False
-                else:
-                    response.json()["0"]
-                response.close()
-                logging.debug("um_modify_margin: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False    
-        logging.debug("um_open_orders: stage: end execution: {}".format(datetime.datetime.now()))
+        endpoint = self.base_url + "/fapi/v1/positionMargin"
+        params = {  
+            "symbol": symbol,
+            "type": type,
+            "amount": amt, 
+            "positionSide": position
+        }
+        self._request("POST", endpoint, params, signed= True, retry= retry)
         return None
 
+    def um_query_order(
+            self,
+            symbol: str,
+            client_order_id: str = None,
+            order_id: int = None,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        params = {"symbol": symbol, "orderId": order_id} if order_id is not None else {"symbol": symbol, "origClientOrderId": client_order_id}
+        return self.orders.update(self._request("GET", endpoint, params, signed= True, retry= retry))
+
     def um_search_order(
             self, 
             symbol: str, 
-            client_order_id: str
+            client_order_id: str,
+            retry: RetryPolicy = None
         ) -> pd.DataFrame:
-        open_orders = self.um_open_orders(symbol= symbol)
-        searched = open_orders
-        if open_orders.empty == False:
-            searched = open_orders[open_orders["clientOrderId"] == client_order_id]
-        return searched
-  
+        try:
+            order = self.um_query_order(symbol, client_order_id= client_order_id, retry= retry)
+        except ClientError as error:
+            if error.code != -2013:
+                raise
+            return pd.DataFrame()
+        return pd.DataFrame([order])
+
+    def _order(
+            self,
+            params: dict,
+            retry: RetryPolicy
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        self.orders.submitted(params)
+        try:
+            ack = self._request("POST", endpoint, params, signed= True, retry= retry)
+        except TradingAPIError as error:
+            self.orders.failed(params.get("newClientOrderId"), error)
+            raise
+        self.orders.update(ack)
+        return order_ack(ack)
+
     def um_market_order(
             self, 
             symbol: str, 
             side: str, 
             qty: float, 
             position: str, 
-            client_order_id: str
-        ) -> None:
-        logging.debug("um_market_order: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/order"
-        api_secret = self.secret
-        api_key = self.key
-        error_bool = True
-        l = float(self.um_info(symbol)["filters"][1]["stepSize"])
-        qty_precision = 0
-        while l != 1.0:
-            l *= 10.0
-            qty_precision += 1
-        logging.debug("um_market_order: stage: initializate request: {}".format(datetime.datetime.now()))
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "quantity": np.round(qty, qty_precision),
-                    "side": side,
-                    "positionSide": position,
-                    "type": "MARKET",
-                    "newClientOrderId": client_order_id,
-                    "timestamp": int(datetime.datetime.now().timestamp()*1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_market_order: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.post(url= endpoint, params= params, headers= headers)
-                response.json()["orderId"]
-                response.close()
-                logging.debug("um_market_order: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_market_order: stage: end execution: {}".format(datetime.datetime.now()))
-        return None
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        qty_precision = self.um_filters(symbol)["qty_precision"]
+        params = {  
+            "symbol": symbol,
+            "quantity": np.round(qty, qty_precision),
+            "side": side,
+            "positionSide": position,
+            "type": "MARKET",
+            "newClientOrderId": client_order_id
+        }
+        return self._order(params, retry)
     
     def um_limit_order(
             self, 
@@ -471,135 +1367,43 @@ class TRADING_API:
             price: float, 
             qty: float, 
             position: str,
-            client_order_id: str
-        ) -> None:
-        logging.debug("um_limit_order: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/order"
-        api_secret = self.secret
-        api_key = self.key
-        info = self.um_info(symbol)
-        k = float(info["filters"][0]["tickSize"])
-        l = float(info["filters"][1]["stepSize"])
-        price_precision = 0
-        while k != 1.0:
-            k *= 10.0
-            price_precision += 1
-        qty_precision = 0
-        while l != 1.0:
-            l *= 10.0
-            qty_precision += 1
-        logging.debug("um_limit_order: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try: 
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "quantity": np.round(qty, qty_precision),
-                    "price": np.round(price, price_precision),
-                    "side": side,
-                    "positionSide": position,
-                    "type": "LIMIT",
-                    "timeInForce": "GTC",
-                    "newClientOrderId": client_order_id,
-                    "timestamp": int(datetime.datetime.now().timestamp()*1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_limit_order: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.post(url= endpoint, params= params, headers= headers)
-                response.json()["orderId"]
-                response.close()
-                logging.debug("um_limit_order: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_limit_order: stage: end execution: {}".format(datetime.datetime.now()))
-        return None
-   
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        filters = self.um_filters(symbol)
+        params = {  
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "price": np.round(price, filters["price_precision"]),
+            "side": side,
+            "positionSide": position,
+            "type": "LIMIT",
+            "timeInForce": "GTC",
+            "newClientOrderId": client_order_id
+        }
+        return self._order(params, retry)
+
     def um_stop_order(
             self, 
             symbol: str, 
             side: str, 
             price: float, 
             qty: float, 
-            position: str, 
-            client_order_id: str
-        ) -> None:
-        logging.debug("um_stop_order: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/order"
-        api_secret = self.secret
-        api_key = self.key
-        info = self.um_info(symbol)
-        k = float(info["filters"][0]["tickSize"])
-        l = float(info["filters"][1]["stepSize"])
-        price_precision = 0
-        while k != 1.0:
-            k *= 10.0
-            price_precision += 1
-        qty_precision = 0
-        while l != 1.0:
-            l *= 10.0
-            qty_precision += 1
-        logging.debug("um_stop_order: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "quantity": np.round(qty, qty_precision),
-                    "stopPrice": np.round(price, price_precision),
-                    "side": side,
-                    "positionSide": position,
-                    "type": "STOP_MARKET",
-                    "newClientOrderId": client_order_id,
-                    "timestamp": int(datetime.datetime.now().timestamp()*1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_stop_order: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.post(url= endpoint, params= params, headers= headers)
-                response.json()["orderId"]
-                response.close()
-                logging.debug("um_stop_order: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_stop_order: stage: end execution: {}".format(datetime.datetime.now()))
-        return None
+            position: str,
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        filters = self.um_filters(symbol)
+        params = {  
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "stopPrice": np.round(price, filters["price_precision"]),
+            "side": side,
+            "positionSide": position,
+            "type": "STOP_MARKET",
+            "newClientOrderId": client_order_id
+        }
+        return self._order(params, retry)
 
     def um_take_order(
             self, 
@@ -607,225 +1411,141 @@ class TRADING_API:
             side: str, 
             price: float, 
             qty: float, 
-            position: str, 
-            client_order_id: str
-        ) -> None:
-        logging.debug("um_take_order: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/order"
-        api_secret = self.secret
-        api_key = self.key
-        info = self.um_info(symbol)
-        k = float(info["filters"][0]["tickSize"])
-        l = float(info["filters"][1]["stepSize"])
-        price_precision = 0
-        while k != 1.0:
-            k *= 10.0
-            price_precision += 1
-        qty_precision = 0
-        while l != 1.0:
-            l *= 10.0
-            qty_precision += 1
-        logging.debug("um_take_order: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "quantity": np.round(qty, qty_precision),
-                    "stopPrice": np.round(price, price_precision),
-                    "side": side,
-                    "positionSide": position,
-                    "type": "TAKE_PROFIT_MARKET",
-                    "newClientOrderId": client_order_id,
-                    "timestamp": int(datetime.datetime.now().timestamp()*1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_take_order: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.post(url= endpoint, params= params, headers= headers)
-                response.json()["orderId"]
-                response.close()
-                logging.debug("um_take_order: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_take_order: stage: end execution: {}".format(datetime.datetime.now()))
-        return None
+            position: str,
+            client_order_id: str,
+            retry: RetryPolicy = None
+        ) -> dict:
+        filters = self.um_filters(symbol)
+        params = {  
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "stopPrice": np.round(price, filters["price_precision"]),
+            "side": side,
+            "positionSide": position,
+            "type": "TAKE_PROFIT_MARKET",
+            "newClientOrderId": client_order_id
+        }
+        return self._order(params, retry)
+
+    def _batch_post(
+            self,
+            chunk: list,
+            retry: RetryPolicy
+        ) -> list:
+        endpoint = self.base_url + "/fapi/v1/batchOrders"
+        params = {"batchOrders": json.dumps(chunk, separators= (",", ":"))}
+        for payload in chunk:
+            self.orders.submitted(payload)
+        try:
+            results = self._request("POST", endpoint, params, signed= True, retry= retry)
+        except TradingAPIError as error:
+            for payload in chunk:
+                self.orders.failed(payload.get("newClientOrderId"), error)
+            # a failed chunk must not hide the acks of the chunks that went through
+            return batch_error_rows(chunk, error)
+        for payload, result in zip(chunk, results):
+            self.orders.record(payload, result)
+        return results
+
+    def um_batch_orders(
+            self,
+            orders,
+            workers: int = 4,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        orders = pd.DataFrame(orders)
+        filters = {symbol: self.um_filters(symbol) for symbol in orders["symbol"].unique()}
+        payloads = order_payloads(orders, filters)
+        chunks = [payloads[i: i + 5] for i in range(0, len(payloads), 5)]
+        with ThreadPoolExecutor(max_workers= workers) as executor:
+            results = [result for chunk in executor.map(lambda chunk: self._batch_post(chunk, retry), chunks) for result in chunk]
+        return pd.DataFrame(results)
+
+    def um_grid_orders(
+            self,
+            symbol: str,
+            side: str,
+            prices,
+            qtys,
+            position: str,
+            order_type: str = "LIMIT",
+            client_order_ids: list = None,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        prices = np.asarray(prices, dtype= "float64")
+        orders = pd.DataFrame({
+            "symbol": symbol,
+            "side": side,
+            "positionSide": position,
+            "type": order_type,
+            "quantity": np.broadcast_to(np.asarray(qtys, dtype= "float64"), prices.shape),
+            "price" if order_type == "LIMIT" else "stopPrice": prices
+        })
+        if client_order_ids is not None:
+            orders["newClientOrderId"] = client_order_ids
+        return self.um_batch_orders(orders, retry= retry)
+
+    def um_batch_cancel(
+            self,
+            symbol: str,
+            order_ids: list = None,
+            client_order_ids: list = None,
+            workers: int = 4,
+            retry: RetryPolicy = None
+        ) -> pd.DataFrame:
+        endpoint = self.base_url + "/fapi/v1/batchOrders"
+        if order_ids is not None:
+            key, ids = "orderIdList", [int(order_id) for order_id in order_ids]
+        else:
+            key, ids = "origClientOrderIdList", [str(client_order_id) for client_order_id in client_order_ids]
+        chunks = [ids[i: i + 10] for i in range(0, len(ids), 10)]
+        cancel = lambda chunk: self._request("DELETE", endpoint, {"symbol": symbol, key: json.dumps(chunk, separators= (",", ":"))}, signed= True, retry= retry)
+        with ThreadPoolExecutor(max_workers= workers) as executor:
+            results = [result for chunk in executor.map(cancel, chunks) for result in chunk]
+        for result in results:
+            if "orderId" in result:
+                self.orders.update(result)
+        return pd.DataFrame(results)
 
     def um_cancel_order(
             self, 
             symbol: str, 
-            order_id: int
-        ) -> None:
-        logging.debug("um_cancel_order: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/order"
-        api_secret = self.secret
-        api_key = self.key
-        logging.debug("um_cancel_order: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "orderId": order_id,
-                    "timestamp": int(datetime.datetime.now().timestamp()*1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_cancel_order: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.delete(url= endpoint, params= params, headers= headers)
-                response.json()["orderId"]
-                response.close()
-                logging.debug("um_cancel_order: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_cancel_order: stage: end execution: {}".format(datetime.datetime.now()))
-        return None
+            order_id: int,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        ack = self._request("DELETE", endpoint, {"symbol": symbol, "orderId": order_id}, signed= True, retry= retry)
+        self.orders.update(ack)
+        return order_ack(ack)
    
     def um_cancel_all(
             self, 
-            symbol: str
+            symbol: str,
+            retry: RetryPolicy = None
         ) -> None:
-        logging.debug("um_cancel_all: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/allOpenOrders"
-        api_secret = self.secret
-        api_key = self.key
-        logging.debug("um_cancel_all: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "timestamp": int(datetime.datetime.now().timestamp()*1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_cancel_all: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.delete(url= endpoint, params= params, headers= headers)
-                if response.json()["msg"] == "The operation of cancel all open order is done.":
-                    error_bool == False
-                else:
-                    response.json["0"] 
-                response.close()
-                logging.debug("um_cancel_all: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: args: {}, errno: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_cancel_all: stage: end execution: {}".format(datetime.datetime.now()))
+        endpoint = self.base_url + "/fapi/v1/allOpenOrders"
+        self._request("DELETE", endpoint, {"symbol": symbol}, signed= True, retry= retry)
+        self.orders.canceled_all(symbol)
         return None
 
-    def um_modify_order(self,
-                        client_order_id: str,
-                        symbol: str,
-                        side: str,
-                        qty: float,
-                        price: float
-        ) -> None:
-        logging.debug("um_modify_order: stage: start execution: {}".format(datetime.datetime.now()))
-        endpoint = "https://fapi.binance.com/fapi/v1/order"
-        api_secret = self.secret
-        api_key = self.key
-        info = self.um_info(symbol)
-        k = float(info["filters"][0]["tickSize"])
-        l = float(info["filters"][1]["stepSize"])
-        price_precision = 0
-        while k != 1.0:
-            k *= 10.0
-            price_precision += 1
-        qty_precision = 0
-        while l != 1.0:
-            l *= 10.0
-            qty_precision += 1
-        logging.debug("um_modify_order: stage: initializate request: {}".format(datetime.datetime.now()))
-        error_bool = True
-        while error_bool:
-            try:
-                headers = {
-                    "X-MBX-APIKEY": api_key
-                }
-                params = {  
-                    "symbol": symbol,
-                    "quantity": np.round(qty, qty_precision),
-                    "price": np.round(price, price_precision),
-                    "side": side,
-                    "origClientOrderId": client_order_id,
-                    "timestamp": int(datetime.datetime.now().timestamp()*1000)
-                }
-                query_string = urllib.parse.urlencode(params)
-                signature = hmac.new(api_secret.encode(), query_string.encode(), hashlib.sha256).hexdigest()
-                params["signature"] = signature
-                logging.debug("um_modify_order: stage: execute request: {}".format(datetime.datetime.now()))
-                response = requests.put(url= endpoint, params= params, headers= headers)
-                response.json()["clientOrderId"]
-                response.close()
-                logging.debug("um_modify_order: stage: close request: {}".format(datetime.datetime.now()))
-            except KeyError:
-                logging.debug("ClientExceptionFound: code: {}, msg: {}".format(response.json()["code"], response.json()["msg"]))
-                continue
-            except requests.exceptions.Timeout as error:
-                logging.debug("TimeoutErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                continue
-            except requests.exceptions.RequestException as error:
-                logging.debug("RequestExceptionFound: response: {}".format(error.response))
-                continue
-            except OSError as error:
-                logging.debug("OSErrorFound: code: {}, msg: {}".format(error.errno, error.strerror))
-                break
-            except KeyboardInterrupt:
-                break
-            else:
-                error_bool = False
-        logging.debug("um_modify_order: stage: end execution: {}".format(datetime.datetime.now()))
-        return None
+    def um_modify_order(
+            self,
+            client_order_id: str,
+            symbol: str,
+            side: str,
+            qty: float,
+            price: float,
+            retry: RetryPolicy = None
+        ) -> dict:
+        endpoint = self.base_url + "/fapi/v1/order"
+        filters = self.um_filters(symbol)
+        params = {  
+            "symbol": symbol,
+            "quantity": np.round(qty, filters["qty_precision"]),
+            "price": np.round(price, filters["price_precision"]),
+            "side": side,
+            "origClientOrderId": client_order_id
+        }
+        ack = self._request("PUT", endpoint, params, signed= True, retry= retry)
+        self.orders.update(ack)
+        return order_ack(ack)